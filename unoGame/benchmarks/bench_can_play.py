@@ -0,0 +1,34 @@
+"""
+Microbenchmark of the table-driven can_play against the original rules in can_play_by_rules.
+Run it from the unoGame folder: python -m benchmarks.bench_can_play
+"""
+import random
+import timeit
+
+from card import CARD_IDS, can_play, can_play_by_rules, get_card_catalogue, has_playable_card
+
+NUMBER = 20
+
+
+def any_playable_by_rules(deck_card_id, cards, color):
+    for card in cards:
+        if can_play_by_rules(deck_card_id, card.id, color):
+            return True
+    return False
+
+
+if __name__ == '__main__':
+    pairs = [(deck_card_id, card_id, color) for deck_card_id in CARD_IDS for card_id in CARD_IDS for color in (None, 1, 2, 3, 4)]
+    old_time = timeit.timeit(lambda: [can_play_by_rules(*pair) for pair in pairs], number=NUMBER)
+    new_time = timeit.timeit(lambda: [can_play(*pair) for pair in pairs], number=NUMBER)
+    calls = NUMBER * len(pairs)
+    print(f'can_play: {old_time / calls * 1e9:.0f} ns -> {new_time / calls * 1e9:.0f} ns per call ({old_time / new_time:.1f}x)')
+
+    random.seed(0)
+    catalogue = get_card_catalogue()
+    for hand_size in (7, 25, 100):
+        hands = [(random.choice(CARD_IDS), random.choices(catalogue, k=hand_size), random.randint(1, 4)) for _ in range(200)]
+        old_time = timeit.timeit(lambda: [any_playable_by_rules(*hand) for hand in hands], number=NUMBER)
+        new_time = timeit.timeit(lambda: [has_playable_card(*hand) for hand in hands], number=NUMBER)
+        calls = NUMBER * len(hands)
+        print(f'any playable card in {hand_size} cards: {old_time / calls * 1e6:.2f} us -> {new_time / calls * 1e6:.2f} us ({old_time / new_time:.1f}x)')
@@ -0,0 +1,49 @@
+"""
+Microbenchmark of the game state codec against the original functions in protocal.py.
+The codec sends each player only his own cards, so the packet sizes are printed too.
+Run it from the unoGame folder: python -m benchmarks.bench_codec
+"""
+import random
+import timeit
+
+from card import read_cards_from_csv
+from codec import encode_game_state, decode_game_state
+from player import Player
+from protocal import get_game_state_packet_server, unpack_cards_info_client
+from room import Room
+
+NUMBER = 2000
+
+
+def make_room(hand_size, players_num=4, seed=0):
+    random.seed(seed)
+    room = Room('bench')
+    cards = read_cards_from_csv()
+    room.cards = cards * (1 + hand_size * players_num // len(cards))
+    random.shuffle(room.cards)
+    for i in range(players_num):
+        player = Player(f'player{i}', room.name, None, None, i == 0)
+        player.cards_in_hand = [room.cards.pop() for _ in range(hand_size)]
+        room.add_player(player)
+    room.curr_card = room.cards.pop()
+    room.curr_card_color = 1
+    room.curr_player = room.players[0]
+    return room
+
+
+def bench(name, old, new):
+    old_time = timeit.timeit(old, number=NUMBER)
+    new_time = timeit.timeit(new, number=NUMBER)
+    print(f'{name:<28}{old_time / NUMBER * 1e6:>10.2f} us{new_time / NUMBER * 1e6:>10.2f} us{old_time / new_time:>9.1f}x')
+
+
+if __name__ == '__main__':
+    print(f'{"":<28}{"protocal":>13}{"codec":>13}{"speedup":>10}')
+    for hand_size in (7, 25, 100):
+        room = make_room(hand_size)
+        viewer = room.players[0]
+        old_packet = get_game_state_packet_server(room)
+        packet = encode_game_state(room, False, viewer)
+        bench(f'encode, 4 x {hand_size} cards', lambda: get_game_state_packet_server(room), lambda: encode_game_state(room, False, viewer))
+        bench(f'decode, 4 x {hand_size} cards', lambda: unpack_cards_info_client(old_packet), lambda: decode_game_state(packet))
+        print(f'{"packet size":<28}{len(old_packet):>10} B {len(packet):>10} B')
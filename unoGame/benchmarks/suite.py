@@ -0,0 +1,221 @@
+"""
+Benchmark suite with reproducible seeds and stored baselines.
+Every benchmark is timed several times and the best time per operation is compared to benchmarks/baseline.json.
+A benchmark that is more than --tolerance slower than its baseline fails, and the exit status is 1.
+Run it from the unoGame folder:
+    python -m benchmarks.suite                    compare with the baseline
+    python -m benchmarks.suite --update-baseline  store the current times as the baseline
+    python -m benchmarks.suite codec tcp          only run the benchmarks whose names contain one of the words
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import socket
+import sys
+import threading
+import timeit
+
+from card import CARD_IDS, can_play, get_card_catalogue, has_playable_card, read_cards_from_csv
+from codec import encode_client_header, encode_game_state, decode_game_state
+from framing import FramedSocket
+from player import Player
+from policy import RandomPolicy
+from protocal import PacketType, get_game_state_packet_server, unpack_cards_info_client
+from room import Room
+from server import Server, LISTEN_BACKLOG
+from simulator import play_match
+from benchmarks.bench_codec import make_room
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+REPEAT = 5  # Each benchmark is timed this many times and the best time is kept
+TOLERANCE = 0.5  # A benchmark fails if it is more than 50% slower than its baseline
+SEED = 0
+
+BENCHMARKS = {}  # The function that prepares each benchmark, by name
+
+
+def benchmark(name):
+    """
+    Register a benchmark. The decorated function prepares the data with fixed seeds
+    and returns the function to time and the number of operations it does per call.
+    """
+    def register(prepare):
+        BENCHMARKS[name] = prepare
+        return prepare
+    return register
+
+
+def add_codec_benchmarks():
+    for hand_size in (7, 25, 100):
+        def prepare_encode_protocal(hand_size=hand_size):
+            room = make_room(hand_size, seed=SEED)
+            return lambda: get_game_state_packet_server(room), 1
+
+        def prepare_decode_protocal(hand_size=hand_size):
+            packet = get_game_state_packet_server(make_room(hand_size, seed=SEED))
+            return lambda: unpack_cards_info_client(packet), 1
+
+        def prepare_encode_codec(hand_size=hand_size):
+            room = make_room(hand_size, seed=SEED)
+            viewer = room.players[0]
+            return lambda: encode_game_state(room, False, viewer), 1
+
+        def prepare_decode_codec(hand_size=hand_size):
+            room = make_room(hand_size, seed=SEED)
+            packet = encode_game_state(room, False, room.players[0])
+            return lambda: decode_game_state(packet), 1
+
+        benchmark(f'protocal.encode_state.4x{hand_size}')(prepare_encode_protocal)
+        benchmark(f'protocal.decode_state.4x{hand_size}')(prepare_decode_protocal)
+        benchmark(f'codec.encode_state.4x{hand_size}')(prepare_encode_codec)
+        benchmark(f'codec.decode_state.4x{hand_size}')(prepare_decode_codec)
+
+
+add_codec_benchmarks()
+
+
+@benchmark('card.can_play')
+def prepare_can_play():
+    rng = random.Random(SEED)
+    triples = [(rng.choice(CARD_IDS), rng.choice(CARD_IDS), rng.randint(1, 4)) for _ in range(1000)]
+    return lambda: [can_play(*triple) for triple in triples], len(triples)
+
+
+@benchmark('card.has_playable_card.25')
+def prepare_has_playable_card():
+    rng = random.Random(SEED)
+    catalogue = get_card_catalogue()
+    hands = [(rng.choice(CARD_IDS), rng.choices(catalogue, k=25), rng.randint(1, 4)) for _ in range(200)]
+    return lambda: [has_playable_card(*hand) for hand in hands], len(hands)
+
+
+@benchmark('card.parse_csv')
+def prepare_parse_csv():
+    # The catalogue is cached after the first call, so time the parsing itself
+    return get_card_catalogue.__wrapped__, 1
+
+
+@benchmark('card.read_cards_from_csv')
+def prepare_read_cards_from_csv():
+    return read_cards_from_csv, 1
+
+
+@benchmark('room.shuffling_cards')
+def prepare_shuffling_cards():
+    room = Room('bench')
+    room.random = random.Random(SEED)
+    for i in range(4):
+        room.add_player(Player(f'player{i}', room.name, None, None, i == 0, True))
+
+    def shuffle():
+        room.reset_game(True)
+        room.shuffling_cards()
+    return shuffle, 1
+
+
+@benchmark('simulator.match')
+def prepare_match():
+    def match():
+        # The same seed every time, so every call plays the same match
+        rng = random.Random(SEED)
+        policies = [RandomPolicy(random.Random(seat)) for seat in range(4)]
+        play_match(policies, rng)
+    return match, 1
+
+
+@benchmark('server.tcp_round_trip')
+def prepare_tcp_round_trip():
+    # A CALL_UNO packet is broadcast to every player of the room, including the sender
+    server = Server('127.0.0.1', 0)
+    port = server.server_socket.getsockname()[1]
+    server.server_socket.listen(LISTEN_BACKLOG)  # Listen before connecting, the server thread may not have started yet
+    threading.Thread(target=server.start, daemon=True).start()
+    client = FramedSocket(socket.create_connection(('127.0.0.1', port)))
+    client.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    client.send(encode_client_header(PacketType.LOGIN.value, 'player0', 'bench'))
+    client.recv_packet()
+    packet = encode_client_header(PacketType.CALL_UNO.value, 'player0', 'bench')
+    round_trips = 100
+
+    def round_trip():
+        for _ in range(round_trips):
+            client.send(packet)
+            client.recv_packet()
+    return round_trip, round_trips
+
+
+def run_benchmark(name):
+    """
+    :param name: the name of a registered benchmark
+    :return: the best time of one operation, in seconds
+    """
+    with contextlib.redirect_stdout(io.StringIO()):  # The server of the TCP benchmark prints a line when it starts
+        function, operations = BENCHMARKS[name]()
+        timer = timeit.Timer(function)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(REPEAT, number))
+    return best / number / operations
+
+
+def format_time(seconds):
+    if seconds >= 1e-3:
+        return f'{seconds * 1e3:.2f} ms'
+    if seconds >= 1e-6:
+        return f'{seconds * 1e6:.2f} us'
+    return f'{seconds * 1e9:.0f} ns'
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark suite of the Uno game')
+    parser.add_argument('names', nargs='*', help='only run the benchmarks whose names contain one of these words')
+    parser.add_argument('--update-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='allowed slowdown, 0.5 means 50%% slower')
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline()
+    machine = f'{platform.python_implementation()} {platform.python_version()} {platform.machine()}'
+    if baseline.get('machine', machine) != machine:
+        print(f'warning: the baseline was measured on {baseline["machine"]}, this is {machine}')
+    baseline_times = baseline.get('times', {})
+    results = {}
+    failures = []
+    print(f'{"benchmark":<32}{"time/op":>12}{"baseline":>12}{"change":>9}')
+    for name in BENCHMARKS:
+        if args.names and not any(word in name for word in args.names):
+            continue
+        results[name] = run_benchmark(name)
+        line = f'{name:<32}{format_time(results[name]):>12}'
+        if name in baseline_times:
+            change = results[name] / baseline_times[name] - 1
+            line += f'{format_time(baseline_times[name]):>12}{change:>+8.0%}'
+            if change > args.tolerance:
+                failures.append(name)
+                line += '  REGRESSION'
+        print(line)
+
+    if args.update_baseline:
+        baseline_times.update(results)
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump({'machine': machine, 'seed': SEED, 'times': baseline_times}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'baseline written to {BASELINE_FILE}')
+        return 0
+    if failures:
+        print(f'{len(failures)} regressions: {", ".join(failures)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+from codec import encode_client_header
+from player import Player
+from policy import get_policy
+from protocal import PacketType
+
+BOT_NAME_PREFIX = 'bot'
+BOT_MOVE_LIMIT = 100000  # Bots stop after this many moves in a row, in case no human is left to end the game
+
+
+class BotPlayer(Player):
+    """
+    A player without a network client. It sits in a room like any other player, and the room asks its policy
+    for a move as soon as it's the bot's turn, so the bot plays in the server process without any socket.
+    """
+
+    def __init__(self, name, room_name, policy, compact_hand=True):
+        """
+        :param name: name of the bot
+        :param room_name: name of the room
+        :param policy: the Policy that chooses the moves of the bot
+        :param compact_hand: store the cards in hand as a Hand
+        """
+        super().__init__(name, room_name, None, None, False, compact_hand)
+        self.policy = policy
+
+    def play_turn(self, room):
+        """
+        Make one move: play the card chosen by the policy, or draw a card.
+        Like a person, the bot calls uno when it's left with one card.
+        :param room: the room
+        :return:
+        """
+        move = self.policy.choose_move(room, self)
+        if move is None:
+            room.draw_card(self.name)
+            return
+        card_id, card_color = move
+        if len(self.cards_in_hand) == 2:
+            room.call_uno(encode_client_header(PacketType.CALL_UNO.value, self.name, room.name), self.name)
+        room.play_card(self.name, card_id, card_color)
+
+
+def create_bots(room, policy_name, rng=None):
+    """
+    Create bots for the empty seats of a room
+    :param room: the room
+    :param policy_name: the name of the policy of the bots, see policy.POLICIES
+    :param rng: a random.Random for the policies
+    :return: a list of BotPlayer
+    """
+    bots = []
+    i = 1
+    while len(room.players) + len(bots) < 4:
+        name = f'{BOT_NAME_PREFIX}{i}'
+        i += 1
+        if room.player_exists(name):
+            continue
+        bots.append(BotPlayer(name, room.name, get_policy(policy_name, rng)))
+    return bots
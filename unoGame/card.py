@@ -1,4 +1,5 @@
 import csv
+import functools
 import os
 from enum import Enum
 from constant import CARDS_CSV
@@ -25,8 +26,10 @@ class CardAction(Enum):
 
 class Card:
     """
-    Card class, simulate cards
+    Card class, simulate cards.
+    Cards never change, so every room shares the same 108 objects of the card catalogue.
     """
+    __slots__ = ('id', 'name', 'image_name')
 
     def __init__(self, id, name, image_name):
         """
@@ -41,10 +44,15 @@ class Card:
         self.image_name = os.path.join('images', image_name)
 
 
-def read_cards_from_csv():
+# Stands for a card in an opponent's hand, whose id the client doesn't know
+HIDDEN_CARD = Card(None, 'UNKNOWN', 'N.png')
+
+
+@functools.lru_cache(maxsize=None)
+def get_card_catalogue():
     """
-    Read all the cards from the CSV file.
-    :return: A list containing objects of all the cards.
+    Read all the cards from the CSV file. The file is only read the first time, later calls return the same cards.
+    :return: A tuple containing objects of all the cards.
     """
     cards = []
     with open(CARDS_CSV, 'r') as f:
@@ -56,16 +64,37 @@ def read_cards_from_csv():
             for _ in range(num):
                 # Add the card with the specified quantity to the "cards" list.
                 cards.append(Card(id, name, image_name))
-    return cards
+    return tuple(cards)
+
+
+@functools.lru_cache(maxsize=None)
+def get_cards_by_id():
+    """
+    :return: A dictionary of one card of the catalogue for each card id
+    """
+    cards_by_id = {}
+    for card in get_card_catalogue():
+        cards_by_id.setdefault(card.id, card)
+    return cards_by_id
+
+
+def read_cards_from_csv():
+    """
+    Get all the cards of a deck.
+    :return: A new list containing the shared objects of all the cards.
+    """
+    return list(get_card_catalogue())
 
 
-def get_card_by_id(id, cards):
+def get_card_by_id(id, cards=None):
     """
     In the "cards" list, find the card corresponding to the given id.
     :param id: id
-    :param cards: a list
+    :param cards: a list, if it's None, look the card up in the card catalogue instead
     :return: the card whose id is id
     """
+    if cards is None:
+        return get_cards_by_id().get(id)
     for card in cards:
         if card.id == id:
             return card
@@ -130,8 +159,9 @@ def is_wild_card(card_id):
     return False
 
 
-def can_play(curr_deck_card_id, curr_clicked_card_id, curr_deck_card_color=None):
+def can_play_by_rules(curr_deck_card_id, curr_clicked_card_id, curr_deck_card_color=None):
     """
+    The rules behind can_play, which builds its lookup tables from this function.
     The id and color of the card on the deck is known, judge whether the current clicked card id by the player can be played
     If the card on the deck is a regular or action card, we can get its color by its id directly. otherwise, if it's a wild card, the color is specified by the previous player.
     so there is curr_deck_card_color in the arguments.
@@ -229,3 +259,81 @@ def get_card_color_by_id(card_id):
         return CardColor.RED.value
     elif 60 <= card_id <= 72:
         return CardColor.YELLOW.value
+
+
+# Lookup tables built once from the rules above, indexed by card id. Ids that are not used by any card are all zero.
+CARD_ID_NUM = 91  # Card ids are from 0 to 90
+COLOR_NUM = 5  # 0 means no color, for example a wild card whose color hasn't been chosen yet, and 1 to 4 are CardColor
+CARD_IDS = sorted(set(range(0, 13)) | set(range(20, 33)) | set(range(40, 53)) | set(range(60, 73)) | {80, 90})
+CARD_COLORS = [0] * CARD_ID_NUM  # Color of each card, 0 for wild cards
+CARD_NUMBERS = [-1] * CARD_ID_NUM  # Number on the face of regular cards, -1 for other cards
+CARD_ACTIONS = [0] * CARD_ID_NUM  # CardAction value of action cards, 0 for other cards
+CARD_POINTS = [0] * CARD_ID_NUM  # Points a card in hand is worth to the winner of a round
+CARD_IS_WILD = [False] * CARD_ID_NUM
+for _card_id in CARD_IDS:
+    if is_wild_card(_card_id):
+        CARD_IS_WILD[_card_id] = True
+        CARD_POINTS[_card_id] = 50
+    else:
+        CARD_COLORS[_card_id] = get_card_color_by_id(_card_id)
+        if is_regular_card(_card_id):
+            CARD_NUMBERS[_card_id] = get_card_num(_card_id)
+            CARD_POINTS[_card_id] = _card_id % 10
+        else:
+            CARD_ACTIONS[_card_id] = get_card_action_by_id(_card_id)
+            CARD_POINTS[_card_id] = 20
+
+# PLAYABLE[(deck card id * CARD_ID_NUM + clicked card id) * COLOR_NUM + color] is 1 if the clicked card can be played,
+# and PLAYABLE_MASKS[deck card id * COLOR_NUM + color] has bit "card id" set for every card that can be played
+_playable = bytearray(CARD_ID_NUM * CARD_ID_NUM * COLOR_NUM)
+PLAYABLE_MASKS = [0] * (CARD_ID_NUM * COLOR_NUM)
+for _deck_card_id in CARD_IDS:
+    for _color in range(COLOR_NUM):
+        for _card_id in CARD_IDS:
+            if can_play_by_rules(_deck_card_id, _card_id, _color if _color != 0 else None):
+                _playable[(_deck_card_id * CARD_ID_NUM + _card_id) * COLOR_NUM + _color] = 1
+                PLAYABLE_MASKS[_deck_card_id * COLOR_NUM + _color] |= 1 << _card_id
+PLAYABLE = bytes(_playable)
+del _playable, _card_id, _deck_card_id, _color
+
+
+def can_play(curr_deck_card_id, curr_clicked_card_id, curr_deck_card_color=None):
+    """
+    The id and color of the card on the deck is known, judge whether the current clicked card id by the player can be played.
+    Gives the same answer as can_play_by_rules with one table lookup.
+    :param curr_deck_card_id:
+    :param curr_clicked_card_id:
+    :param curr_deck_card_color: only used if the card on the deck is a wild card
+    :return: True or False
+    """
+    if not curr_deck_card_color or curr_deck_card_color >= COLOR_NUM:
+        curr_deck_card_color = 0
+    return PLAYABLE[(curr_deck_card_id * CARD_ID_NUM + curr_clicked_card_id) * COLOR_NUM + curr_deck_card_color] == 1
+
+
+def get_playable_mask(curr_deck_card_id, curr_deck_card_color=None):
+    """
+    :param curr_deck_card_id:
+    :param curr_deck_card_color: only used if the card on the deck is a wild card
+    :return: a bitmask with bit "card id" set for every card id that can be played
+    """
+    if not curr_deck_card_color or curr_deck_card_color >= COLOR_NUM:
+        curr_deck_card_color = 0
+    return PLAYABLE_MASKS[curr_deck_card_id * COLOR_NUM + curr_deck_card_color]
+
+
+def has_playable_card(curr_deck_card_id, cards, curr_deck_card_color=None):
+    """
+    Judge whether any card in a hand can be played
+    :param curr_deck_card_id:
+    :param cards: the cards in the hand
+    :param curr_deck_card_color: only used if the card on the deck is a wild card
+    :return: True or False
+    """
+    playable_mask = get_playable_mask(curr_deck_card_id, curr_deck_card_color)
+    # A list has no mask of its own, and building one costs more than this loop, which stops at the first playable card.
+    # A Hand keeps its mask up to date, see hand.hand_has_playable_card.
+    for card in cards:
+        if playable_mask >> card.id & 1:
+            return True
+    return False
@@ -30,6 +30,16 @@ class Client:
             return False
         return True
 
+    def post_event(self, event):
+        """
+        Queue an event for the main window and wake the main window up, it's called by the receiving thread
+        :param event: an Event
+        :return:
+        """
+        self.events.put(event)
+        if self.gui is not None:
+            self.gui.wake_up()
+
     def play(self):
         """
         Build the main window and pass this client object in as arguments
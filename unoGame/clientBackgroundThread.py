@@ -1,7 +1,7 @@
 import socket
-import struct
 import threading
-from protocal import PacketType, unpack_cards_info_client
+from protocal import PacketType
+from codec import get_packet_type, decode_player_list, decode_game_state, decode_state_delta, decode_client_header, decode_game_over
 from event import Event, EventType
 
 
@@ -14,36 +14,37 @@ def receive_message(client: 'Client'):
 
     while True:
         try:
-            packet = client.client_socket.recv(1024)
-            packet_type = struct.unpack('>I', packet[:4])[0]
+            packet = client.client_socket.recv_packet()
+            if len(packet) == 0:  # The server closed the connection
+                break
+            packet_type = get_packet_type(packet)
             if packet_type == PacketType.PLAYER_LIST.value:
-                names_length = struct.unpack('>I', packet[4:8])[0]
-                names = struct.unpack(f'>{names_length}s', packet[8:])[0].decode('ASCII')
-                names = names.split(';')
+                names = decode_player_list(packet)
                 event = Event(EventType.UPDATE_PLAYER_LIST)
                 event.updated_player_list = names
-                client.events.put(event)
+                client.post_event(event)
             elif packet_type == PacketType.START_GAME.value:
                 event = Event(EventType.START_GAME)
-                client.events.put(event)
+                client.post_event(event)
             elif packet_type == PacketType.PLAYER_CARDS_INFO.value:
                 event = Event(EventType.GAME_STATE)
-                event.cards_info = unpack_cards_info_client(packet)
-                client.events.put(event)
+                event.cards_info = decode_game_state(packet)
+                client.post_event(event)
+            elif packet_type == PacketType.STATE_DELTA.value:
+                event = Event(EventType.GAME_STATE_DELTA)
+                event.cards_info = decode_state_delta(packet)
+                client.post_event(event)
             elif packet_type == PacketType.CALL_UNO.value:
-                packet_type, len_room_name, len_player_name = struct.unpack('>III', packet[:12])
-                room_name = struct.unpack(f'{len_room_name}s', packet[12:12 + len_room_name])[0].decode('ASCII')
-                player_name = struct.unpack(f'{len_player_name}s', packet[12 + len_room_name:12 + len_room_name + len_player_name])[0].decode('ASCII')
+                packet_type, room_name, player_name, _ = decode_client_header(packet)
                 event = Event(EventType.CALL_UNO)
                 event.player_name = player_name
-                client.events.put(event)
+                client.post_event(event)
             elif packet_type == PacketType.FINAL_WIN.value:
-                name_length = struct.unpack('>I', packet[4:8])[0]
-                player_name = struct.unpack(f'>{name_length}s', packet[8:8 + name_length])[0].decode('ASCII')
+                player_name = decode_game_over(packet)
                 event = Event(EventType.FINAL_WIN)
                 event.player_name = player_name
-                client.events.put(event)
+                client.post_event(event)
             else:
                 print('Unknown packet type')
         except ConnectionResetError:
-            continue
+            break
@@ -9,9 +9,10 @@ from player import Player
 from player_view import PlayerView
 from deck import Deck
 from clientBackgroundThread import receive_message
-from event import Event, EventType
+from event import Event, EventType, coalesce_events
 from protocal import *
 from card import *
+import imageCache
 
 sys.setrecursionlimit(10000000)
 
@@ -23,12 +24,19 @@ class ClientGUI:
         self.root.geometry(f'{WINDOW_WIDTH}x{WINDOW_HEIGHT}')
         self.root.resizable(width=False, height=False)
         self.root.title('Uno Game')
+        imageCache.prewarm()  # Decode and resize every card image now, so the game never waits for it
         self.create_menu_bar()
         self.players_frames = []  # type:list[PlayerView]
+        self.seat_names = []  # type:list[str] # Names of the players in the order of the server, state deltas refer to players by this index
         self.init_frames()
 
         self.background_listening_thread = threading.Thread(target=receive_message, args=(self.client,))
         self.background_listening_thread.daemon = True
+        # The receiving thread wakes the main loop up with a virtual event, at most one wakeup is pending at a time
+        self.wakeup_lock = threading.Lock()
+        self.wakeup_pending = False
+        self.updating = False  # Set while update_ui runs, a dialog it opens must not apply newer events first
+        self.root.bind('<<ServerEvent>>', self.on_server_event)
 
     def show_help(self):
         webbrowser.open('gameInstructions.html')
@@ -77,73 +85,177 @@ class ClientGUI:
         self.client.player.client_socket.send(packet)
 
     def show(self):
-        self.background_listening_thread.start()
-        self.root.after(100, self.update_ui)
+        # Tk only accepts calls from another thread once the main loop runs, so the receiving thread is started from it
+        self.root.after_idle(self.background_listening_thread.start)
         self.root.mainloop()
 
-    def update_ui(self):
-        while self.client is not None and not self.client.events.empty():
-            event = self.client.events.get(timeout=0.1)  # type:Event
-            if event.event_type == EventType.UPDATE_PLAYER_LIST:
-                myself_id = event.updated_player_list.index(self.client.player.name)
-                players = [self.client.player, None, None, None]
-                for i, name in enumerate(event.updated_player_list):
-                    if i == myself_id:
-                        continue
-                    players[i - myself_id] = Player(name)
-                for i, name in enumerate(players):
-                    self.players_frames[i].update_player(players[i])
-            elif event.event_type == EventType.START_GAME:
-                self.center_frame.first = True
-                for player_view in self.players_frames:
-                    player = player_view.player
-                    if player is not None:
-                        player.cards_in_hand.clear()
-                        player_view.update_view()
-            elif event.event_type == EventType.GAME_STATE:
-                print(event.cards_info)
-                first = event.cards_info['first']
-                self.center_frame.first = first
-                self.center_frame.update_view(event.cards_info['cards_num'], event.cards_info['curr_card_id'], event.cards_info['curr_card_color'])
-
-                for player_info in event.cards_info['players']:
-                    for player_view in self.players_frames:
-                        if player_view.player is not None and player_view.player.name == player_info['name']:
-                            player_view.turn = player_info['turn']
-                            player_view.player.cards_in_hand = [get_card_by_id(card_id, self.center_frame.all_cards) for card_id in player_info['cards']]
-                            player_view.player.score = player_info['score']
-                            player_view.update_view()
-                self.center_frame.deck_clickable = False
-                if self.bottom_frame.turn is True:
-                    self.center_frame.my_turn = True
-                    player_can_play = False
-                    for card in self.bottom_frame.player.cards_in_hand:
-                        card_id = card.id
-                        if can_play(self.center_frame.curr_card_id, card_id, self.center_frame.curr_card_color):
-                            player_can_play = True
-                            break
-                    if not player_can_play:
-                        self.center_frame.set_clickable()
+    def wake_up(self):
+        """
+        Make the main loop handle the queued events right away. It's called by the receiving thread after it has queued
+        an event. Nothing is done if a wakeup is already pending, as the main loop takes all the queued events at once.
+        :return:
+        """
+        with self.wakeup_lock:
+            if self.wakeup_pending:
+                return
+            self.wakeup_pending = True
+        try:
+            self.root.event_generate('<<ServerEvent>>', when='tail')
+        except (RuntimeError, tk.TclError):
+            pass  # The window has been closed
+
+    def on_server_event(self, _):
+        with self.wakeup_lock:
+            # Cleared before the queue is read, so an event queued from now on wakes the main loop up again
+            self.wakeup_pending = False
+        self.update_ui()
+
+    def get_player_view(self, player_name):
+        """
+        Find the view that displays the player with the given name
+        :param player_name:
+        :return: PlayerView or None
+        """
+        for player_view in self.players_frames:
+            if player_view.player is not None and player_view.player.name == player_name:
+                return player_view
+        return None
+
+    def update_my_turn(self):
+        """
+        After the state has changed, decide whether it's my turn and whether I have to draw a card
+        :return:
+        """
+        self.center_frame.deck_clickable = False
+        if self.bottom_frame.turn is True:
+            self.center_frame.my_turn = True
+            player_can_play = has_playable_card(self.center_frame.curr_card_id, self.bottom_frame.player.cards_in_hand, self.center_frame.curr_card_color)
+            if not player_can_play:
+                self.center_frame.set_clickable()
+        else:
+            self.center_frame.my_turn = False
+
+    def apply_state_delta(self, delta):
+        """
+        Apply a state delta to the state received in the last full snapshot
+        :param delta: the dictionary returned by decode_state_delta
+        :return:
+        """
+        self.center_frame.first = False
+        self.center_frame.update_view(delta['cards_num'], delta['curr_card_id'], delta['curr_card_color'])
+        changed_views = set()
+        if delta['played_seat'] is not None:
+            player_view = self.get_player_view(self.seat_names[delta['played_seat']])
+            if player_view is not None:
+                # Remove the played card from the hand of the player
+                for card in player_view.player.cards_in_hand:
+                    if card.id == delta['played_card_id'] or card is HIDDEN_CARD:
+                        player_view.player.cards_in_hand.remove(card)
+                        break
+                changed_views.add(player_view)
+        for seat, card_num, card_ids in delta['draws']:
+            player_view = self.get_player_view(self.seat_names[seat])
+            if player_view is not None:
+                if card_ids is not None:
+                    player_view.player.cards_in_hand += [get_card_by_id(card_id) for card_id in card_ids]
                 else:
-                    self.center_frame.my_turn = False
+                    player_view.player.cards_in_hand += [HIDDEN_CARD] * card_num
+                changed_views.add(player_view)
+        turn_name = self.seat_names[delta['turn_seat']] if delta['turn_seat'] is not None else None
+        for player_view in self.players_frames:
+            if player_view.player is None:
+                continue
+            turn = player_view.player.name == turn_name
+            if player_view.turn != turn:
+                player_view.turn = turn
+                changed_views.add(player_view)
+        for player_view in changed_views:
+            player_view.update_view()
+        self.update_my_turn()
+
+    def update_ui(self):
+        """
+        Handle the queued events. A dialog opened while handling an event runs a nested main loop, in which a wakeup
+        calls this method again. That call returns at once and leaves the new events to the outer call, which keeps
+        taking events until the queue is empty, so the events are always applied in order.
+        :return:
+        """
+        if self.client is None or self.updating:
+            return
+        self.updating = True
+        try:
+            while not self.client.events.empty():
+                events = []
+                while not self.client.events.empty():
+                    events.append(self.client.events.get_nowait())
+                # A client that has fallen behind jumps to the latest game state instead of rendering every one
+                for event in coalesce_events(events):
+                    self.handle_event(event)
+        finally:
+            self.updating = False
+
+    def handle_event(self, event):
+        """
+        Apply one event of the receiving thread to the views
+        :param event:
+        :return:
+        """
+        if event.event_type == EventType.UPDATE_PLAYER_LIST:
+            myself_id = event.updated_player_list.index(self.client.player.name)
+            players = [self.client.player, None, None, None]
+            for i, name in enumerate(event.updated_player_list):
+                if i == myself_id:
+                    continue
+                players[i - myself_id] = Player(name)
+            for i, name in enumerate(players):
+                self.players_frames[i].update_player(players[i])
+        elif event.event_type == EventType.START_GAME:
+            self.center_frame.first = True
+            for player_view in self.players_frames:
+                player = player_view.player
+                if player is not None:
+                    player.cards_in_hand.clear()
+                    player_view.update_view()
+        elif event.event_type == EventType.GAME_STATE:
+            print(event.cards_info)
+            self.bottom_frame.play_in_flight = False  # The server has answered the card played, if any
+            first = event.cards_info['first']
+            self.center_frame.first = first
+            self.center_frame.update_view(event.cards_info['cards_num'], event.cards_info['curr_card_id'], event.cards_info['curr_card_color'])
+
+            self.seat_names = [player_info['name'] for player_info in event.cards_info['players']]
+            for player_info in event.cards_info['players']:
+                player_view = self.get_player_view(player_info['name'])
+                if player_view is not None:
+                    player_view.turn = player_info['turn']
+                    if player_info['cards'] is not None:
+                        player_view.player.cards_in_hand = [get_card_by_id(card_id) for card_id in player_info['cards']]
+                    else:
+                        # Only the number of cards of the other players is known
+                        player_view.player.cards_in_hand = [HIDDEN_CARD] * player_info['cards_num']
+                    player_view.player.score = player_info['score']
+                    player_view.update_view()
+            self.update_my_turn()
 
-                if self.center_frame.first and event.cards_info['curr_card_id'] == 80:
+            if self.center_frame.first and event.cards_info['curr_card_id'] == 80:
+                choice = simpledialog.askstring('Select an color', 'Input "b", "g", "r", or "y" for blue, green, red, yellow respectively:')
+                while not choice or choice not in ['b', 'g', 'r', 'y']:
                     choice = simpledialog.askstring('Select an color', 'Input "b", "g", "r", or "y" for blue, green, red, yellow respectively:')
-                    while not choice or choice not in ['b', 'g', 'r', 'y']:
-                        choice = simpledialog.askstring('Select an color', 'Input "b", "g", "r", or "y" for blue, green, red, yellow respectively:')
-                    self.center_frame.curr_card_color = ['b', 'g', 'r', 'y'].index(choice) + 1
-            elif event.event_type == EventType.CALL_UNO:
-                for player_view in self.players_frames:
-                    if player_view.player is not None and player_view.player.name == event.player_name:
-                        player_view.call_uno()
-            elif event.event_type == EventType.FINAL_WIN:
-                for player_view in self.players_frames:
-                    if player_view.player is not None:
-                        player_view.player.cards_in_hand.clear()
-                        player_view.turn = False
-                        player_view.update_view()
-                messagebox.showinfo('game over', message=f'The winner is {event.player_name}')
-        self.root.after(100, self.update_ui)
+                self.center_frame.curr_card_color = ['b', 'g', 'r', 'y'].index(choice) + 1
+        elif event.event_type == EventType.GAME_STATE_DELTA:
+            self.bottom_frame.play_in_flight = False
+            self.apply_state_delta(event.cards_info)
+        elif event.event_type == EventType.CALL_UNO:
+            for player_view in self.players_frames:
+                if player_view.player is not None and player_view.player.name == event.player_name:
+                    player_view.call_uno()
+        elif event.event_type == EventType.FINAL_WIN:
+            for player_view in self.players_frames:
+                if player_view.player is not None:
+                    player_view.player.cards_in_hand.clear()
+                    player_view.turn = False
+                    player_view.update_view()
+            messagebox.showinfo('game over', message=f'The winner is {event.player_name}')
 
 
 if __name__ == '__main__':
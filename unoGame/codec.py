@@ -0,0 +1,334 @@
+import struct
+import sys
+import weakref
+from array import array
+
+from protocal import PacketType
+
+# Precompiled layouts of every fixed-size part of the packets. All integers are big-endian unsigned 32-bit.
+U32 = struct.Struct('>I')
+LOGIN_RESPONSE = struct.Struct('>Ic')  # packet type, b'A' administrator or b'N' common user
+CLIENT_HEADER = struct.Struct('>III')  # packet type, length of the room name, length of the player name
+PLAY_CARD_BODY = struct.Struct('>II')  # card id, card color
+LENGTH_PREFIXED = struct.Struct('>II')  # packet type, length of the string that follows
+STATE_HEADER = struct.Struct('>III')  # packet type, number of cards in the deck, first state of a round
+STATE_CURR_CARD = struct.Struct('>III')  # 1, id and color of the current card
+STATE_PLAYER = struct.Struct('>III')  # score, 1 if it's this player's turn, number of cards in hand
+# packet type, number of cards in the deck, id and color of the current card, clockwise,
+# seat of the current player, seat of the player who played a card and the id of that card, number of draws that follow.
+# After the draws come the seat of the receiver and the ids of the cards dealt to the receiver.
+DELTA_HEADER = struct.Struct('>IIIIIIIII')
+DELTA_DRAW = struct.Struct('>II')  # seat of the player who drew cards, number of cards
+# The shape and the struct.Struct of the public part of the last snapshot of each room, see get_state_layout.
+# The entry of a room goes away with the room.
+STATE_LAYOUTS = weakref.WeakKeyDictionary()
+NO_SEAT = 0xFFFFFFFF  # Seat value meaning "nobody"
+
+CARD_ID_ARRAY_TYPE = 'I'
+assert array(CARD_ID_ARRAY_TYPE).itemsize == 4
+SWAP_BYTES = sys.byteorder == 'little'  # Packets are big-endian, so arrays have to be byteswapped on little-endian machines
+
+
+def pack_card_ids(card_ids):
+    """
+    Pack a list of card ids in a single call
+    :param card_ids: an iterable of card ids
+    :return: an array('I') in network byte order
+    """
+    ids = array(CARD_ID_ARRAY_TYPE, card_ids)
+    if SWAP_BYTES:
+        ids.byteswap()
+    return ids
+
+
+def unpack_card_ids(buffer, offset, num):
+    """
+    Unpack num card ids in a single call
+    :param buffer: the packet
+    :param offset: where the first card id starts
+    :param num: the number of card ids
+    :return: a list of card ids
+    """
+    ids = array(CARD_ID_ARRAY_TYPE)
+    ids.frombytes(buffer[offset:offset + num * 4])
+    if SWAP_BYTES:
+        ids.byteswap()
+    return ids.tolist()
+
+
+def get_packet_type(packet):
+    return U32.unpack_from(packet)[0]
+
+
+def encode_login_response(packet_type, is_admin=False):
+    return LOGIN_RESPONSE.pack(packet_type, b'A' if is_admin else b'N')
+
+
+def decode_login_response(packet):
+    """
+    :param packet: the response to a LOGIN packet
+    :return: packet type, whether the player is the administrator of the room
+    """
+    packet_type, is_admin = LOGIN_RESPONSE.unpack_from(packet)
+    return packet_type, is_admin == b'A'
+
+
+def encode_client_header(packet_type, player_name, room_name):
+    room_name = room_name.encode('ASCII')
+    player_name = player_name.encode('ASCII')
+    return CLIENT_HEADER.pack(packet_type, len(room_name), len(player_name)) + room_name + player_name
+
+
+def decode_client_header(packet):
+    """
+    Decode the header that every packet sent by a client starts with
+    :param packet: a packet sent by a client
+    :return: packet type, room name, player name, and the offset of the rest of the packet
+    :raise struct.error: if the packet is shorter than its header says
+    :raise UnicodeDecodeError: if a name isn't ASCII
+    """
+    packet_type, len_room_name, len_player_name = CLIENT_HEADER.unpack_from(packet)
+    offset = CLIENT_HEADER.size
+    if offset + len_room_name + len_player_name > len(packet):
+        raise struct.error('the names run past the end of the packet')
+    room_name = bytes(packet[offset:offset + len_room_name]).decode('ASCII')
+    offset += len_room_name
+    player_name = bytes(packet[offset:offset + len_player_name]).decode('ASCII')
+    offset += len_player_name
+    return packet_type, room_name, player_name, offset
+
+
+def encode_play_card(player_name, room_name, card_id, card_color):
+    return encode_client_header(PacketType.PLAY_CARD.value, player_name, room_name) + PLAY_CARD_BODY.pack(card_id, card_color)
+
+
+def decode_play_card_body(packet, offset):
+    """
+    :param packet: a PLAY_CARD packet
+    :param offset: the offset returned by decode_client_header
+    :return: card id, card color
+    """
+    return PLAY_CARD_BODY.unpack_from(packet, offset)
+
+
+def encode_start_game():
+    return U32.pack(PacketType.START_GAME.value)
+
+
+def encode_player_list(names):
+    names_str = ';'.join(names).encode('ASCII')
+    return LENGTH_PREFIXED.pack(PacketType.PLAYER_LIST.value, len(names_str)) + names_str
+
+
+def decode_player_list(packet):
+    names_length = LENGTH_PREFIXED.unpack_from(packet)[1]
+    offset = LENGTH_PREFIXED.size
+    return bytes(packet[offset:offset + names_length]).decode('ASCII').split(';')
+
+
+def encode_game_over(final_winner_player):
+    name = final_winner_player.name.encode('ASCII')
+    return LENGTH_PREFIXED.pack(PacketType.FINAL_WIN.value, len(name)) + name
+
+
+def decode_game_over(packet):
+    name_length = LENGTH_PREFIXED.unpack_from(packet)[1]
+    offset = LENGTH_PREFIXED.size
+    return bytes(packet[offset:offset + name_length]).decode('ASCII')
+
+
+def get_state_layout(room, has_curr_card):
+    """
+    The layout of the public part of a PLAYER_CARDS_INFO packet only depends on the names of the players and on
+    whether there is a current card, so a room compiles it again only when a player joins or leaves.
+    :param room: the room
+    :param has_curr_card: whether the room has a current card
+    :return: struct.Struct
+    """
+    shape = (has_curr_card, [player.name for player in room.players])
+    layout = STATE_LAYOUTS.get(room)
+    if layout is None or layout[0] != shape:
+        fmt = ['>IIIIII' if has_curr_card else '>IIII', 'I']
+        for name in shape[1]:
+            fmt.append(f'I{len(name)}sIII')
+        layout = (shape, struct.Struct(''.join(fmt)))
+        STATE_LAYOUTS[room] = layout
+    return layout[1]
+
+
+def encode_game_state_public(room, first=False):
+    """
+    Encode the part of a PLAYER_CARDS_INFO packet that is the same for every player in the room.
+    Opponents' hands are secret, so only the number of cards in each hand is included.
+    The whole part is written by a single call of the room's precompiled struct.Struct.
+    :param room: the room
+    :param first: whether this is the first state of a round
+    :return: the public part of the packet
+    """
+    curr_card = room.curr_card
+    curr_seat = room.curr_seat
+    values = [PacketType.PLAYER_CARDS_INFO.value, len(room.cards), 1 if first else 0]
+    if curr_card is not None:
+        values += (1, curr_card.id, room.curr_card_color)
+    else:
+        values.append(0)
+    values.append(len(room.players))
+    for seat, player in enumerate(room.players):
+        name = player.name.encode('ASCII')
+        values += (len(name), name, player.score, 1 if seat == curr_seat else 0, len(player.cards_in_hand))
+    return get_state_layout(room, curr_card is not None).pack(*values)
+
+
+def encode_game_state_private(seat, player):
+    """
+    Encode the end of a PLAYER_CARDS_INFO packet for one player: his seat and the ids of the cards in his hand
+    :param seat: the index of the player in room.players, or NO_SEAT
+    :param player: the player, or None
+    :return: the private part of the packet
+    """
+    if player is None:
+        return U32.pack(NO_SEAT)
+    return U32.pack(seat) + pack_card_ids([card.id for card in player.cards_in_hand]).tobytes()
+
+
+def encode_game_state(room, first=False, viewer=None):
+    """
+    Encode the state of a room into a PLAYER_CARDS_INFO packet for one player
+    :param room: the room
+    :param first: whether this is the first state of a round
+    :param viewer: the player who receives the packet, only his own cards are sent
+    :return: the packet
+    """
+    if viewer is None:
+        return encode_game_state_public(room, first) + encode_game_state_private(NO_SEAT, None)
+    return encode_game_state_public(room, first) + encode_game_state_private(room.seats[viewer.name], viewer)
+
+
+def decode_game_state(packet):
+    """
+    Decode a PLAYER_CARDS_INFO packet
+    :param packet: the packet
+    :return: a dictionary. Every player has "cards_num", and only the receiver of the packet has the ids in "cards",
+             for the other players "cards" is None
+    """
+    result = {}
+    _, result['cards_num'], first = STATE_HEADER.unpack_from(packet)
+    result['first'] = first == 1
+    offset = STATE_HEADER.size
+    has_curr_card = U32.unpack_from(packet, offset)[0]
+    if has_curr_card == 1:
+        _, result['curr_card_id'], result['curr_card_color'] = STATE_CURR_CARD.unpack_from(packet, offset)
+        offset += STATE_CURR_CARD.size
+    else:
+        result['curr_card_id'] = None
+        offset += U32.size
+    players_num = U32.unpack_from(packet, offset)[0]
+    offset += U32.size
+    result['players'] = []
+    for _ in range(players_num):
+        player_info = {}
+        name_length = U32.unpack_from(packet, offset)[0]
+        offset += U32.size
+        player_info['name'] = bytes(packet[offset:offset + name_length]).decode('ASCII')
+        offset += name_length
+        player_info['score'], turn, player_info['cards_num'] = STATE_PLAYER.unpack_from(packet, offset)
+        player_info['turn'] = turn == 1
+        player_info['cards'] = None
+        offset += STATE_PLAYER.size
+        result['players'].append(player_info)
+    seat = U32.unpack_from(packet, offset)[0]
+    offset += U32.size
+    if seat != NO_SEAT:
+        player_info = result['players'][seat]
+        player_info['cards'] = unpack_card_ids(packet, offset, player_info['cards_num'])
+    return result
+
+
+def encode_state_delta_public(room, played=None, draws=()):
+    """
+    Encode the part of a STATE_DELTA packet that is the same for every player in the room: what changed after a move.
+    Players are identified by their seat, that is, their index in room.players, which the clients learn from the last
+    PLAYER_CARDS_INFO packet. For the cards dealt during the move, only the seat and the number of cards are included.
+    :param room: the room
+    :param played: (player, card) if a card was played, otherwise None
+    :param draws: a list of (player, card), the cards dealt during the move in order
+    :return: the public part of the packet, and the list of [seat, card ids] to pass to encode_state_delta_private
+    """
+    seats = room.seats
+    # Merge consecutive cards dealt to the same player
+    groups = []  # type:list[list]
+    for player, card in draws:
+        seat = seats[player.name]
+        if groups and groups[-1][0] == seat:
+            groups[-1][1].append(card.id)
+        else:
+            groups.append([seat, [card.id]])
+    curr_card = room.curr_card
+    buffer = bytearray(DELTA_HEADER.size + DELTA_DRAW.size * len(groups))
+    DELTA_HEADER.pack_into(buffer, 0, PacketType.STATE_DELTA.value, len(room.cards),
+                           curr_card.id if curr_card is not None else 0, room.curr_card_color or 0, 1 if room.clockwise else 0,
+                           room.curr_seat if room.curr_seat is not None else NO_SEAT,
+                           seats[played[0].name] if played is not None else NO_SEAT, played[1].id if played is not None else 0,
+                           len(groups))
+    offset = DELTA_HEADER.size
+    for seat, card_ids in groups:
+        DELTA_DRAW.pack_into(buffer, offset, seat, len(card_ids))
+        offset += DELTA_DRAW.size
+    return buffer, groups
+
+
+def encode_state_delta_private(groups, seat):
+    """
+    Encode the end of a STATE_DELTA packet for one player: his seat and the ids of the cards dealt to him
+    :param groups: the list returned by encode_state_delta_public
+    :param seat: the seat of the player, or NO_SEAT
+    :return: the private part of the packet
+    """
+    card_ids = [card_id for group_seat, group_card_ids in groups if group_seat == seat for card_id in group_card_ids]
+    return U32.pack(seat) + pack_card_ids(card_ids).tobytes()
+
+
+def encode_state_delta(room, viewer=None, played=None, draws=()):
+    """
+    Encode only what changed in a room after a move into a STATE_DELTA packet for one player.
+    The ids of dealt cards are only included for the cards dealt to the viewer.
+    :param room: the room
+    :param viewer: the player who receives the packet
+    :param played: (player, card) if a card was played, otherwise None
+    :param draws: a list of (player, card), the cards dealt during the move in order
+    :return: the packet
+    """
+    public, groups = encode_state_delta_public(room, played, draws)
+    return public + encode_state_delta_private(groups, room.seats[viewer.name] if viewer is not None else NO_SEAT)
+
+
+def decode_state_delta(packet):
+    """
+    Decode a STATE_DELTA packet
+    :param packet: the packet
+    :return: a dictionary, seats that are "nobody" are None. Each draw is (seat, number of cards, card ids),
+             the card ids are None unless the cards were dealt to the receiver of the packet
+    """
+    result = {}
+    (_, result['cards_num'], result['curr_card_id'], result['curr_card_color'], clockwise, turn_seat,
+     played_seat, played_card_id, draws_num) = DELTA_HEADER.unpack_from(packet)
+    result['clockwise'] = clockwise == 1
+    result['turn_seat'] = None if turn_seat == NO_SEAT else turn_seat
+    result['played_seat'] = None if played_seat == NO_SEAT else played_seat
+    result['played_card_id'] = played_card_id
+    offset = DELTA_HEADER.size
+    draws = []
+    for _ in range(draws_num):
+        draws.append(DELTA_DRAW.unpack_from(packet, offset))
+        offset += DELTA_DRAW.size
+    viewer_seat = U32.unpack_from(packet, offset)[0]
+    offset += U32.size
+    # The ids of the cards dealt to the receiver follow, in the order of the draws
+    result['draws'] = []
+    for seat, card_num in draws:
+        if seat == viewer_seat:
+            result['draws'].append((seat, card_num, unpack_card_ids(packet, offset, card_num)))
+            offset += 4 * card_num
+        else:
+            result['draws'].append((seat, card_num, None))
+    return result
@@ -13,6 +13,11 @@ CARDS_CSV = 'images/cards.csv'
 UNKNOWN_CARD_image_path = 'images/N.png'
 CARD_HEIGHT = 150
 CARD_WIDTH = 100
+DECK_CARD_HEIGHT = 180  # Size of the deck and of the current card in the middle of the window
+DECK_CARD_WIDTH = 120
+# How the cards of a hand are drawn: 'labels' shows each card in its own label, 'canvas' draws them as image items on
+# one canvas per seat. The canvas mode hasn't been tried on a display yet, so the labels stay the default.
+HAND_RENDER_MODE = 'labels'
 
 
 def init():
@@ -1,10 +1,10 @@
 import tkinter as tk
 from player import Player
 from constant import *
-from card import Card, read_cards_from_csv, get_card_by_id
+from card import Card, get_card_catalogue, get_card_by_id
 import random
-from PIL import ImageTk, Image
 from protocal import *
+from imageCache import get_photo_image
 
 BRIGHT_COLORS = ['#55afff', '#55aa55', '#ff5555', '#ffaa00']
 
@@ -37,7 +37,7 @@ class Deck(tk.Frame):
         self.content_frame.place(x=15, y=20)
 
         self.cards_num = 0
-        self.all_cards = read_cards_from_csv()
+        self.all_cards = get_card_catalogue()
 
     def draw_background(self):
         self.background_canvas = tk.Canvas(self, width=self.width, height=self.height)
@@ -56,9 +56,12 @@ class Deck(tk.Frame):
         self.background_canvas.create_line(x1, y2 - radius, x1, y1 + radius, width=5, fill=outline_color)
 
     def draw_color_canvas(self):
+        color = 'white' if self.curr_card_color is None else BRIGHT_COLORS[self.curr_card_color - 1]
         if self.curr_color_canvas is not None:
-            self.curr_color_canvas.place_forget()
-        self.curr_color_canvas = tk.Canvas(self.background_canvas, width=20, height=180, bg='white' if self.curr_card_color is None else BRIGHT_COLORS[self.curr_card_color - 1])
+            # Reuse the canvas, a new one for every update would never be freed
+            self.curr_color_canvas['bg'] = color
+            return
+        self.curr_color_canvas = tk.Canvas(self.background_canvas, width=20, height=180, bg=color)
         self.curr_color_canvas.place(x=262, y=20)
 
         # for color_rectangle in self.color_rectangles_in_canvas:
@@ -69,12 +72,14 @@ class Deck(tk.Frame):
         # self.curr_color_canvas.create_rectangle(0, 160, 20, 180, fill=BRIGHT_COLORS[3] if self.curr_card_color is not None and self.curr_card_color - 1 == 3 else DARK_COLORS[3])
 
     def draw_deck(self):
-        image = Image.open(UNKNOWN_CARD_image_path)
-        image = image.resize((120, 180))
-        self.deck_image = ImageTk.PhotoImage(image)
+        self.deck_image = get_photo_image(UNKNOWN_CARD_image_path, (DECK_CARD_WIDTH, DECK_CARD_HEIGHT))
         self.deck_label = tk.Label(self.content_frame, image=self.deck_image)
         self.deck_label.image = self.deck_image
-        self.deck_label.pack(side=tk.LEFT)
+        if self.curr_card_label is not None:
+            # The deck is drawn again once cards are back in it, it must stay left of the current card
+            self.deck_label.pack(side=tk.LEFT, before=self.curr_card_label)
+        else:
+            self.deck_label.pack(side=tk.LEFT)
         self.deck_label.bind('<Button-1>', self.on_deck_label_click)
 
     def on_deck_label_click(self, event):
@@ -91,23 +96,26 @@ class Deck(tk.Frame):
         self.curr_card_id = curr_card_id
         self.curr_card_color = curr_card_color
         if cards_num == 0:
-            self.deck_label.pack_forget()
-            self.deck_label = None
+            if self.deck_label is not None:
+                self.deck_label.destroy()
+                self.deck_label = None
         else:
             if self.deck_label is None:
                 self.draw_deck()
-        if self.curr_card_label is not None:
-            self.curr_card_label.pack_forget()
-            self.curr_card_label = None
-            self.curr_card_image = None
-        if curr_card_id is not None:
-            card = get_card_by_id(curr_card_id, self.all_cards)
-            image = Image.open(card.image_name)
-            image = image.resize((120, 180))
-            image = ImageTk.PhotoImage(image)
-            self.curr_card_label = tk.Label(self.content_frame, image=image)
+        if curr_card_id is None:
+            if self.curr_card_label is not None:
+                self.curr_card_label.destroy()
+                self.curr_card_label = None
+        else:
+            card = get_card_by_id(curr_card_id)
+            image = get_photo_image(card.image_name, (DECK_CARD_WIDTH, DECK_CARD_HEIGHT))
+            if self.curr_card_label is None:
+                self.curr_card_label = tk.Label(self.content_frame, image=image)
+                self.curr_card_label.pack()
+            else:
+                # Swap the image of the label in place
+                self.curr_card_label['image'] = image
             self.curr_card_label.image = image
-            self.curr_card_label.pack()
         self.draw_color_canvas()
 
     def set_clickable(self):
@@ -0,0 +1,438 @@
+import random
+from collections import namedtuple
+from enum import Enum
+
+from card import *
+from hand import remove_card_by_id, get_hand_score, hand_has_playable_card
+from codec import encode_game_state_public, encode_game_state_private, encode_state_delta_public, encode_state_delta_private, encode_player_list, encode_start_game, encode_game_over
+
+
+class GameEventType(Enum):
+    PLAYER_JOINED = 1
+    PLAYER_LEFT = 2
+    ROUND_STARTED = 3
+    CARD_PLAYED = 4
+    CARD_DEALT = 5
+    DECK_RESHUFFLED = 6
+    UNO_CALLED = 7
+    ROUND_WON = 8
+    GAME_WON = 9
+
+
+# Something that happened in the game. player and card are None if they don't apply, value is the score for ROUND_WON
+GameEvent = namedtuple('GameEvent', ['event_type', 'player', 'card', 'value'], defaults=[None, None, None])
+# A packet for one player
+Outbound = namedtuple('Outbound', ['player', 'packet'])
+
+
+class GameEngine:
+    """
+    The rules of the game, without any socket.
+    Instead of sending packets, the engine collects the packets for each player and the events of the game,
+    and take_output() hands them over. Room delivers the packets to the client sockets right away instead.
+    """
+
+    def __init__(self, name=None, rng=None, emit_packets=True, record_events=True):
+        """
+        Initialization function
+        :param name: name of the room
+        :param rng: a random.Random used to shuffle the cards, the random module by default
+        :param emit_packets: whether to encode packets for the players. A simulation that only needs the rules can turn it off.
+        :param record_events: whether to record GameEvent objects
+        """
+        self.name = name
+        self.random = rng if rng is not None else random
+        self.emit_packets = emit_packets
+        self.record_events = record_events
+        self.events = []  # type:list[GameEvent]
+        self.outbox = []  # type:list[Outbound]
+        self.players = []  # type:list[Player] # The players in the room
+        self.cards = []  # cards in Deck
+        self.discard_pile = []  # Discard Pile
+        self.curr_card = None  # type:Card # The current card, which can also be said to be the last card played, That's the top of the discard pile
+        self.curr_card_color = None  # the color of the current card
+        self.curr_seat = None  # The index in self.players of the current player, that is, the player who is going to play
+        self.seats = {}  # type:dict[str,int] # The index in self.players of each player, by name
+        self.admin_player = None  # type:Player # The caretaker of the room
+        self.clockwise = True  # Clockwise(True) or counterclockwise(False)
+        self.started = False  # Is the game started?
+        self.drawn_cards = []  # type:list[tuple[Player,Card]] # The cards dealt during the current move, sent in the state delta
+        self.final_winner = None  # type:Player # The player who reached 500 points
+        self.round_count = 0  # The number of rounds dealt
+        self.reshuffle_count = 0  # The number of times the discard pile was shuffled back into the deck
+
+    def record(self, event_type, player=None, card=None, value=None):
+        if self.record_events:
+            self.events.append(GameEvent(event_type, player, card, value))
+
+    def deliver(self, player, packet):
+        """
+        Hand a packet over to a player. The engine keeps it in the outbox, Room overrides this to send it.
+        :param player: the receiver
+        :param packet: the packet
+        :return:
+        """
+        self.outbox.append(Outbound(player, packet))
+
+    def take_output(self):
+        """
+        Take the events and packets produced since the last call
+        :return: a list of GameEvent, a list of Outbound
+        """
+        events, outbox = self.events, self.outbox
+        self.events, self.outbox = [], []
+        return events, outbox
+
+    def is_full(self):
+        """
+        Determine if the room is full
+        :return: True or False
+        """
+        return len(self.players) >= 4
+
+    def player_exists(self, player_name):
+        """
+        Determine if the player's name already exists
+        :param player_name:
+        :return: True or False
+        """
+
+        return player_name in self.seats
+
+    def add_player(self, player):
+        """
+        Add a player
+        :param player: a new player
+        :return:
+        """
+        player.set_room(self)
+        self.seats[player.name] = len(self.players)
+        self.players.append(player)
+        if player.is_admin:
+            self.admin_player = player
+        self.record(GameEventType.PLAYER_JOINED, player)
+        # Because the player in the room has updated, notify the other players
+        if self.emit_packets:
+            packet = encode_player_list([p.name for p in self.players])
+            self.broadcast(packet, exclude=player)
+
+    def broadcast(self, packet, exclude=None):
+        """
+        Send the same packet to every player in the room.
+        The packet is encoded once by the caller and handed to deliver() for each player.
+        :param packet: the packet to send
+        :param exclude: a player who doesn't need the packet
+        :return:
+        """
+        for player in self.players:
+            if exclude is not None and player.name == exclude.name:
+                continue
+            self.deliver(player, packet)
+
+    def broadcast_state(self, first=False):
+        """
+        Send a full snapshot of the game state to every player. Each player only gets the ids of his own cards,
+        so the part of the packet that is the same for everybody is encoded once.
+        :param first: whether this is the first state of a round
+        :return:
+        """
+        if not self.emit_packets:
+            return
+        public = encode_game_state_public(self, first)
+        for seat, player in enumerate(self.players):
+            self.deliver(player, public + encode_game_state_private(seat, player))
+
+    def broadcast_delta(self, played=None):
+        """
+        Send what changed during the current move to every player. Like the snapshots, the part of the packet that is
+        the same for everybody is encoded once, and each player gets the ids of the cards dealt to him appended.
+        :param played: (player, card) if a card was played, otherwise None
+        :return:
+        """
+        if not self.emit_packets:
+            return
+        public, groups = encode_state_delta_public(self, played, self.drawn_cards)
+        for seat, player in enumerate(self.players):
+            self.deliver(player, public + encode_state_delta_private(groups, seat))
+
+    def shuffling_cards(self):
+        """
+        shuffle cards
+        :return:
+        """
+        self.cards = list(get_card_catalogue())  # type:list[Card] # A deck made of the shared cards of the catalogue
+        self.random.shuffle(self.cards)  # Shuffle the order of the cards
+        self.curr_player = self.get_admin_player()  # The next player to play is the caretaker of the room
+        # Each player is dealt seven cards
+        for i in range(7):
+            for player in self.players:
+                card = self.cards.pop()
+                player.cards_in_hand.append(card)
+        self.started = True
+
+        # Start discarding the pile
+        self.curr_card = self.cards.pop()
+        self.discard_pile.append(self.curr_card)
+
+        if self.curr_card.id in [10, 30, 50, 70]:
+            # the current player misses a turn
+            self.curr_player = self.get_next_player()
+        elif self.curr_card.id in [11, 31, 51, 71]:
+            # play proceeds counterclockwise
+            self.clockwise = False
+        elif self.curr_card.id in [12, 32, 52, 72]:
+            # the player to the left of the current player draws two cards and misses a turn
+            self.curr_player = self.get_next_player()
+            self.deal_card(self.curr_player)
+            self.deal_card(self.curr_player)
+            self.curr_player = self.get_next_player()
+        elif self.curr_card.id == 80:
+            pass
+        elif self.curr_card.id == 90:
+            # Card is returned to the deck, then a new card is laid down into the discard pile (deck may be reshuffled first if needed)
+            while self.curr_card.id == 90:
+                self.discard_pile.remove(self.curr_card)
+                self.cards.append(self.curr_card)
+                self.random.shuffle(self.cards)
+                self.curr_card = self.cards.pop()
+                self.discard_pile.append(self.curr_card)
+        if not is_wild_card(self.curr_card.id):
+            self.curr_card_color = get_card_color_by_id(self.curr_card.id)
+        else:
+            self.curr_card_color = 0
+        self.round_count += 1
+        self.record(GameEventType.ROUND_STARTED, self.curr_player, self.curr_card)
+        #  Sends the current game state information to each player
+        self.broadcast_state(True)
+
+    def deal_card(self, player):
+        """
+        Deal the top card of the deck to a player, and remember it for the state delta of the current move
+        :param player: the player
+        :return:
+        """
+        if len(self.cards) == 0:
+            # Every other card is in the hands of the players
+            return
+        card = self.cards.pop()
+        player.cards_in_hand.append(card)
+        self.drawn_cards.append((player, card))
+        self.record(GameEventType.CARD_DEALT, player, card)
+
+    @property
+    def curr_player(self):
+        """
+        The current player, that is, the player who is going to play
+        :return: Player or None
+        """
+        if self.curr_seat is None:
+            return None
+        return self.players[self.curr_seat]
+
+    @curr_player.setter
+    def curr_player(self, player):
+        self.curr_seat = None if player is None else self.seats[player.name]
+
+    def get_admin_player(self):
+        return self.admin_player
+
+    def get_next_player(self):
+        """
+        Get the next player.
+        :return:
+        """
+        if self.curr_seat is None:
+            return self.get_admin_player()
+        else:
+            if self.clockwise:
+                return self.players[(self.curr_seat + 1) % len(self.players)]
+            else:
+                return self.players[(self.curr_seat + len(self.players) - 1) % len(self.players)]
+
+    def reset_game(self, clean_score=False):
+        """
+        reset the game.
+        :param clean_score: whether score records are cleared
+        :return:
+        """
+
+        self.started = True
+        self.curr_card = None
+        self.curr_player = None
+        self.clockwise = True
+        self.discard_pile.clear()
+        for player in self.players:
+            if clean_score:
+                player.score = 0
+            player.cards_in_hand.clear()
+        if clean_score:
+            self.final_winner = None
+        if self.emit_packets:
+            self.broadcast(encode_start_game())
+
+    def start_game(self):
+        """
+        Start a new game: clear the scores and deal the first round
+        :return:
+        """
+        self.reset_game(True)
+        self.shuffling_cards()
+
+    def play_card(self, player_name, card_id, card_color):
+        self.drawn_cards.clear()
+        assert self.curr_player.name == player_name
+        # Removes the card played by the player from the cards in his hand
+        played_card = remove_card_by_id(self.curr_player.cards_in_hand, card_id)
+        assert played_card is not None
+
+        played_by = self.curr_player
+        self.curr_card = played_card
+        self.curr_card_color = card_color
+        self.record(GameEventType.CARD_PLAYED, played_by, played_card)
+        # Add to discard pile
+        self.discard_pile.append(self.curr_card)
+        # Check if the game is over
+        if self.check_game_over():
+            # Calculate the score for the winner
+            self.calculate_score_for_winner()
+            # Check if the player has more than 500 points
+            final_winner = self.check_500()
+            #  if it is,
+            if final_winner is not None:
+                self.final_winner = final_winner
+                self.record(GameEventType.GAME_WON, final_winner, None, final_winner.score)
+                # Sends a game over message to all clients
+                if self.emit_packets:
+                    self.broadcast(encode_game_over(final_winner))
+                return
+            # Move on to the next round
+            self.reset_game(False)
+            self.shuffling_cards()
+            return
+        # If a regular card is played,
+        if is_regular_card(self.curr_card.id):
+            # The next player to play is the next player
+            self.curr_player = self.get_next_player()
+        # If it's an action card
+        elif is_action_card(self.curr_card.id):
+            # Get the action type
+            action_type = get_card_action_by_id(self.curr_card.id)
+            # If it's a skip card
+            if action_type == CardAction.SKIP.value:
+                # The next player to play is the next player after the next
+                self.curr_player = self.get_next_player()
+                self.curr_player = self.get_next_player()
+            # if it's a reverse card
+            elif action_type == CardAction.REVERSE.value:
+                # Reverse clockwise,
+                self.clockwise = not self.clockwise
+                self.curr_player = self.get_next_player()
+            # if it's a draw two card
+            elif action_type == CardAction.DRAW_TWO.value:
+                # Move on to the next player first
+                self.curr_player = self.get_next_player()
+                # Deal two cards to this player
+                self.check_cards()
+                self.deal_card(self.curr_player)
+                self.check_cards()
+                self.deal_card(self.curr_player)
+                # Move past this player and on to the next player
+                self.curr_player = self.get_next_player()
+        else:
+            assert is_wild_card(self.curr_card.id)
+            #
+            if self.curr_card.id == 80:
+                self.curr_card_color = card_color
+                self.curr_player = self.get_next_player()
+            else:
+                self.curr_player = self.get_next_player()
+                for _ in range(4):
+                    self.check_cards()
+                    self.deal_card(self.curr_player)
+                self.curr_player = self.get_next_player()
+        # Only send what changed: the played card, the cards dealt, the turn and the color
+        self.broadcast_delta((played_by, played_card))
+
+    def remove_player(self, i):
+        """
+        Remove the player in seat i
+        :param i: the index of the player in self.players
+        :return:
+        """
+        player = self.players.pop(i)
+        del self.seats[player.name]
+        self.record(GameEventType.PLAYER_LEFT, player)
+        # The players after seat i move up one seat
+        for seat in range(i, len(self.players)):
+            self.seats[self.players[seat].name] = seat
+        if player is self.admin_player:
+            self.admin_player = None
+        if self.curr_seat is not None:
+            if len(self.players) == 0:
+                self.curr_seat = None
+            elif self.curr_seat > i:
+                self.curr_seat -= 1
+            elif self.curr_seat == i:
+                # It was the turn of the removed player, so it's the turn of the player after him
+                self.curr_seat = i % len(self.players) if self.clockwise else (i - 1) % len(self.players)
+        if self.started and len(self.players) > 0:
+            # The seats of the remaining players have changed, so send them a full snapshot
+            self.broadcast_state()
+
+    def draw_card(self, player_name):
+        assert player_name == self.curr_player.name
+        self.drawn_cards.clear()
+        self.check_cards()
+        self.deal_card(self.curr_player)
+        player_can_play = hand_has_playable_card(self.curr_card.id, self.curr_player.cards_in_hand, self.curr_card_color)
+        if not player_can_play:
+            self.curr_player = self.get_next_player()
+        self.broadcast_delta()
+
+    def call_uno(self, packet, player_name=None):
+        """
+        A player calls uno, pass his CALL_UNO packet on to every player
+        :param packet: the CALL_UNO packet sent by the player
+        :param player_name: the name of the player
+        :return:
+        """
+        if player_name in self.seats:
+            self.record(GameEventType.UNO_CALLED, self.players[self.seats[player_name]])
+        if self.emit_packets:
+            self.broadcast(packet)
+
+    def check_game_over(self):
+        if len(self.curr_player.cards_in_hand) == 0:
+            return True
+        return False
+
+    def calculate_score_for_winner(self):
+        score = 0
+        for player in self.players:
+            if player == self.curr_player:
+                continue
+            score += self.calculate_score_for_player(player)
+        self.curr_player.score += score
+        self.record(GameEventType.ROUND_WON, self.curr_player, None, score)
+
+    def calculate_score_for_player(self, player):
+        return get_hand_score(player.cards_in_hand)
+
+    def check_500(self):
+        for player in self.players:
+            if player.score >= 500:
+                return player
+        return None
+
+    def check_cards(self):
+        if len(self.cards) == 0:
+            for card in self.discard_pile:
+                if card != self.curr_card:
+                    self.cards.append(card)
+            # Only the current card stays in the discard pile
+            self.discard_pile.clear()
+            self.discard_pile.append(self.curr_card)
+            if len(self.cards) > 0:
+                self.random.shuffle(self.cards)
+                self.reshuffle_count += 1
+                self.record(GameEventType.DECK_RESHUFFLED)
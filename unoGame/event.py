@@ -7,6 +7,7 @@ class EventType(Enum):
     GAME_STATE = 3
     CALL_UNO = 4
     FINAL_WIN = 5
+    GAME_STATE_DELTA = 6
 
 
 class Event:
@@ -15,3 +16,27 @@ class Event:
         self.updated_player_list = []  # type:list[str]
         self.cards_info = dict()
         self.player_name = None
+
+
+# Events whose order against the game states matters: a game state is never dropped across one of them
+BARRIER_EVENTS = (EventType.UPDATE_PLAYER_LIST, EventType.START_GAME, EventType.CALL_UNO, EventType.FINAL_WIN)
+STATE_EVENTS = (EventType.GAME_STATE, EventType.GAME_STATE_DELTA)
+
+
+def coalesce_events(events):
+    """
+    Drop the game states that are superseded by a later full game state, so that a client that has fallen behind
+    renders only the latest state. The deltas after the last full state are kept, they apply on top of it.
+    :param events: the queued events, oldest first
+    :return: the events to handle, in the same order
+    """
+    result = []  # type:list[Event]
+    barrier = 0  # Events before this index in result must be kept
+    for event in events:
+        if event.event_type == EventType.GAME_STATE:
+            result[barrier:] = [e for e in result[barrier:] if e.event_type not in STATE_EVENTS]
+        result.append(event)
+        # The first state of a round may ask for the color of a wild card, so it's never dropped
+        if event.event_type in BARRIER_EVENTS or (event.event_type == EventType.GAME_STATE and event.cards_info.get('first')):
+            barrier = len(result)
+    return result
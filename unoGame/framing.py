@@ -0,0 +1,220 @@
+import queue
+import socket
+import struct
+import threading
+
+FRAME_HEADER = struct.Struct('>I')  # Every packet on the wire is preceded by its length
+RECV_BUFFER_SIZE = 65536  # Initial size of the receive buffer of a connection
+MAX_PACKET_SIZE = 65536  # A length header bigger than this is not one of our packets, and the connection is dropped
+OUTBOUND_QUEUE_LIMIT = 1024  # A client with more packets than this waiting to be sent is too slow and gets disconnected
+OUTBOUND_BUFFER_LIMIT = 1024 * 1024  # The same limit in bytes, for the write buffer of an asyncio transport
+
+
+def frame_packet(packet):
+    """
+    Put the length header in front of a packet
+    :param packet: the packet to send
+    :return: the bytes to write to the socket
+    """
+    return FRAME_HEADER.pack(len(packet)) + packet
+
+
+class FrameTooLarge(ValueError):
+    """
+    Raised when a length header is bigger than MAX_PACKET_SIZE, so that a client can't make the server allocate
+    gigabytes with a 4-byte header
+    """
+
+
+class FrameReader:
+    """
+    Reassembles whole packets from a TCP byte stream, no matter how TCP splits or merges them.
+    Each connection has one reader, and the reader reuses its buffer for the lifetime of the connection.
+    """
+
+    def __init__(self, size=RECV_BUFFER_SIZE, max_packet_size=MAX_PACKET_SIZE):
+        """
+        :param size: the initial size of the buffer
+        :param max_packet_size: the biggest packet accepted
+        """
+        self.max_packet_size = max_packet_size
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # The first byte that has not been returned as a packet yet
+        self.end = 0  # The end of the received data
+
+    def make_room(self, needed):
+        """
+        Make sure there are at least "needed" free bytes after the received data
+        :param needed: the number of free bytes required
+        :return:
+        """
+        if len(self.buffer) - self.end >= needed:
+            return
+        pending = self.end - self.start
+        if len(self.buffer) - pending >= needed:
+            # Move the unread data to the front of the buffer
+            self.view[:pending] = self.view[self.start:self.end]
+        else:
+            # The buffer is too small even after moving, so allocate a bigger one
+            new_buffer = bytearray(max(len(self.buffer) * 2, pending + needed))
+            new_buffer[:pending] = self.view[self.start:self.end]
+            self.view.release()
+            self.buffer = new_buffer
+            self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = pending
+
+    def feed(self, data):
+        """
+        Append received bytes to the buffer
+        :param data: bytes received from the stream
+        :return:
+        """
+        self.make_room(len(data))
+        self.view[self.end:self.end + len(data)] = data
+        self.end += len(data)
+
+    def recv_into(self, sock: socket.socket):
+        """
+        Receive bytes from a socket directly into the buffer
+        :param sock: a connected socket
+        :return: the number of bytes received, 0 if the peer closed the connection
+        """
+        self.make_room(RECV_BUFFER_SIZE // 4)
+        n = sock.recv_into(self.view[self.end:])
+        self.end += n
+        return n
+
+    def next_packet(self):
+        """
+        Take the next whole packet out of the buffer
+        :return: the packet without its length header, or None if no whole packet has been received yet
+        :raise FrameTooLarge: if the length header is bigger than max_packet_size, the connection must be dropped
+        """
+        available = self.end - self.start
+        if available < FRAME_HEADER.size:
+            return None
+        length = FRAME_HEADER.unpack_from(self.buffer, self.start)[0]
+        if length > self.max_packet_size:
+            raise FrameTooLarge(f'packet of {length} bytes')
+        if available < FRAME_HEADER.size + length:
+            # Make sure the rest of this packet fits, then wait for more data
+            self.make_room(FRAME_HEADER.size + length - available)
+            return None
+        packet_start = self.start + FRAME_HEADER.size
+        packet = bytes(self.view[packet_start:packet_start + length])
+        self.start = packet_start + length
+        if self.start == self.end:
+            self.start = self.end = 0
+        return packet
+
+
+class FramedSocket:
+    """
+    Wraps a connected socket so that send() and recv_packet() always deal with whole packets.
+    If queued is True, send() only puts the packet in an outbound queue and returns immediately,
+    and a sender thread writes the queued packets to the socket. Then a slow client only delays its own packets.
+    """
+
+    def __init__(self, sock: socket.socket, queued=False):
+        self.sock = sock
+        self.reader = FrameReader()
+        self.closed = False
+        self.outbound = None  # type:queue.Queue
+        self.sender = None  # type:threading.Thread
+        if queued:
+            self.outbound = queue.Queue()
+            self.sender = threading.Thread(target=self.send_queued_packets, daemon=True)
+            self.sender.start()
+
+    def send(self, packet):
+        """
+        Send one packet
+        :param packet: the packet to send
+        :return: the length of the packet
+        """
+        if self.outbound is None:
+            self.sock.sendall(frame_packet(packet))
+        elif not self.closed:
+            if self.outbound.qsize() >= OUTBOUND_QUEUE_LIMIT:
+                self.abort()
+                return 0
+            self.outbound.put(frame_packet(packet))
+        return len(packet)
+
+    def send_queued_packets(self):
+        """
+        The function of the sender thread. Packets that are queued at the same time are written with one sendall call.
+        :return:
+        """
+        while True:
+            data = self.outbound.get()
+            batch = []
+            while data is not None:
+                batch.append(data)
+                try:
+                    data = self.outbound.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self.sock.sendall(b''.join(batch))
+            except OSError:
+                self.closed = True
+                self.shutdown()
+                return
+            if data is None:  # close() was called, and everything queued before it has been sent
+                self.shutdown()
+                return
+
+    def shutdown(self):
+        """
+        Close the socket from the sender thread. shutdown() also wakes up the thread that is blocked in recv_packet().
+        :return:
+        """
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def abort(self):
+        """
+        Drop a client that doesn't read its packets: throw away the queued packets and shut the socket down right away.
+        The sender thread may be blocked in sendall, the shutdown makes that call fail so the thread exits and closes
+        the socket.
+        :return:
+        """
+        self.closed = True
+        try:
+            while True:
+                self.outbound.get_nowait()
+        except queue.Empty:
+            pass
+        self.outbound.put(None)  # Wake the sender thread up if it's waiting for a packet
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def recv_packet(self):
+        """
+        Block until a whole packet has been received
+        :return: the packet, or b'' if the peer closed the connection
+        :raise FrameTooLarge: if the peer sent a length header bigger than MAX_PACKET_SIZE
+        """
+        while True:
+            packet = self.reader.next_packet()
+            if packet is not None:
+                return packet
+            if self.reader.recv_into(self.sock) == 0:
+                return b''
+
+    def close(self):
+        if self.outbound is None:
+            self.sock.close()
+        elif not self.closed:
+            # Let the sender thread close the socket after sending the packets that are still queued
+            self.closed = True
+            self.outbound.put(None)
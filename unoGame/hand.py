@@ -0,0 +1,135 @@
+from card import Card, CARD_ID_NUM, CARD_POINTS, get_playable_mask, has_playable_card
+
+
+class Hand:
+    """
+    The cards in a player's hand, stored by card id.
+    Adding, removing and finding a card, the score of the hand and the playable cards all take constant time,
+    however many cards the hand holds. It can be used wherever a list of cards is used for Player.cards_in_hand,
+    and it iterates over the cards in order of card id.
+    """
+
+    def __init__(self, cards=()):
+        self.cards_by_id = [None] * CARD_ID_NUM  # type:list[list[Card]] # The cards with each card id
+        self.mask = 0  # Bit "card id" is set if the hand holds at least one card with that id
+        self.size = 0
+        self.points = 0  # The points the hand is worth to the winner of a round
+        for card in cards:
+            self.append(card)
+
+    def append(self, card: Card):
+        cards = self.cards_by_id[card.id]
+        if cards is None:
+            cards = self.cards_by_id[card.id] = []
+        cards.append(card)
+        self.mask |= 1 << card.id
+        self.size += 1
+        self.points += CARD_POINTS[card.id]
+
+    def extend(self, cards):
+        for card in cards:
+            self.append(card)
+
+    def __iadd__(self, cards):
+        self.extend(cards)
+        return self
+
+    def remove_id(self, card_id):
+        """
+        Remove one card with the given id
+        :param card_id: the id of a card
+        :return: the removed card, or None if the hand doesn't hold a card with that id
+        """
+        cards = self.cards_by_id[card_id]
+        if not cards:
+            return None
+        card = cards.pop()
+        if not cards:
+            self.mask &= ~(1 << card_id)
+        self.size -= 1
+        self.points -= CARD_POINTS[card_id]
+        return card
+
+    def remove(self, card: Card):
+        cards = self.cards_by_id[card.id]
+        if not cards or card not in cards:
+            raise ValueError('Hand.remove(card): card not in hand')
+        cards.remove(card)
+        if not cards:
+            self.mask &= ~(1 << card.id)
+        self.size -= 1
+        self.points -= CARD_POINTS[card.id]
+
+    def clear(self):
+        self.cards_by_id = [None] * CARD_ID_NUM
+        self.mask = 0
+        self.size = 0
+        self.points = 0
+
+    def count(self, card_id):
+        cards = self.cards_by_id[card_id]
+        return len(cards) if cards else 0
+
+    def __contains__(self, card_or_id):
+        card_id = card_or_id.id if isinstance(card_or_id, Card) else card_or_id
+        return self.mask >> card_id & 1 == 1
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        mask = self.mask
+        while mask:
+            lowest_bit = mask & -mask
+            yield from self.cards_by_id[lowest_bit.bit_length() - 1]
+            mask ^= lowest_bit
+
+    def get_playable_mask(self, curr_deck_card_id, curr_deck_card_color=None):
+        """
+        :param curr_deck_card_id:
+        :param curr_deck_card_color: only used if the card on the deck is a wild card
+        :return: a bitmask with bit "card id" set for every card in the hand that can be played
+        """
+        return self.mask & get_playable_mask(curr_deck_card_id, curr_deck_card_color)
+
+
+def remove_card_by_id(cards, card_id):
+    """
+    Remove one card with the given id from a hand
+    :param cards: a Hand or a list of cards
+    :param card_id: the id of a card
+    :return: the removed card, or None if the hand doesn't hold a card with that id
+    """
+    if isinstance(cards, Hand):
+        return cards.remove_id(card_id)
+    for card in cards:
+        if card.id == card_id:
+            cards.remove(card)
+            return card
+    return None
+
+
+def get_hand_score(cards):
+    """
+    :param cards: a Hand or a list of cards
+    :return: the points the cards are worth to the winner of a round
+    """
+    if isinstance(cards, Hand):
+        return cards.points
+    score = 0
+    for card in cards:
+        score += CARD_POINTS[card.id]
+    return score
+
+
+def hand_has_playable_card(curr_deck_card_id, cards, curr_deck_card_color=None):
+    """
+    Judge whether any card in a hand can be played
+    :param curr_deck_card_id:
+    :param cards: a Hand or a list of cards
+    :param curr_deck_card_color: only used if the card on the deck is a wild card
+    :return: True or False
+    """
+    if isinstance(cards, Hand):
+        return cards.get_playable_mask(curr_deck_card_id, curr_deck_card_color) != 0
+    return has_playable_card(curr_deck_card_id, cards, curr_deck_card_color)
@@ -0,0 +1,61 @@
+from PIL import Image, ImageTk
+
+from card import get_card_catalogue, HIDDEN_CARD
+from constant import CARD_WIDTH, CARD_HEIGHT, DECK_CARD_WIDTH, DECK_CARD_HEIGHT
+
+# Decoded images by file name, and resized and rotated images by (file name, size, rotation).
+# There are only 56 card images and a few sizes, so the caches never need to drop anything.
+decoded_images = {}  # type:dict[str,Image.Image]
+scaled_images = {}  # type:dict[tuple,Image.Image]
+photo_images = {}  # type:dict[tuple,ImageTk.PhotoImage]
+
+
+def get_scaled_image(image_name, size=(CARD_WIDTH, CARD_HEIGHT), rotation=0):
+    """
+    Decode, resize and rotate an image, only the first time it's asked for
+    :param image_name: the path of the image file
+    :param size: (width, height) before rotating
+    :param rotation: degrees counterclockwise, a multiple of 90
+    :return: a PIL image
+    """
+    key = (image_name, size, rotation)
+    image = scaled_images.get(key)
+    if image is None:
+        decoded = decoded_images.get(image_name)
+        if decoded is None:
+            with Image.open(image_name) as f:
+                decoded = decoded_images[image_name] = f.convert('RGBA')
+        image = decoded.resize(size)
+        if rotation % 360 != 0:
+            image = image.rotate(rotation, expand=True)
+        scaled_images[key] = image
+    return image
+
+
+def get_photo_image(image_name, size=(CARD_WIDTH, CARD_HEIGHT), rotation=0):
+    """
+    The Tk image of an image file. The same PhotoImage object is returned every time, so widgets can share it
+    and it's never garbage collected while they show it. Must be called from the Tk thread after the root window exists.
+    :param image_name: the path of the image file
+    :param size: (width, height) before rotating
+    :param rotation: degrees counterclockwise, a multiple of 90
+    :return: ImageTk.PhotoImage
+    """
+    key = (image_name, size, rotation)
+    photo = photo_images.get(key)
+    if photo is None:
+        photo = photo_images[key] = ImageTk.PhotoImage(get_scaled_image(image_name, size, rotation))
+    return photo
+
+
+def prewarm(sizes=((CARD_WIDTH, CARD_HEIGHT), (DECK_CARD_WIDTH, DECK_CARD_HEIGHT))):
+    """
+    Build the images of every card at the given sizes, so that no image is decoded during the game
+    :param sizes: a list of (width, height)
+    :return:
+    """
+    image_names = {card.image_name for card in get_card_catalogue()}
+    image_names.add(HIDDEN_CARD.image_name)
+    for image_name in image_names:
+        for size in sizes:
+            get_photo_image(image_name, size)
@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import random
+import time
+
+from card import CARD_COLORS, CARD_IS_WILD, can_play
+from codec import encode_client_header, encode_play_card, get_packet_type, decode_login_response, decode_game_state, decode_state_delta
+from framing import FrameReader, frame_packet, RECV_BUFFER_SIZE
+from protocal import PacketType
+
+CONNECT_CONCURRENCY = 100  # The number of connections opened at the same time, kept below the listen backlog of the server
+
+
+class LoadStats:
+    """
+    What all the simulated players measured
+    """
+
+    def __init__(self):
+        self.latencies = []  # type:list[float] # Seconds from sending a move to receiving the state that shows it
+        self.moves = 0
+        self.packets = 0  # The number of packets received
+        self.bytes = 0  # The number of bytes received
+        self.games = 0  # The number of games finished
+        self.errors = 0  # Connections that failed or were closed by the server
+        self.seconds = 0.0  # How long the load ran
+
+    def percentile(self, p):
+        """
+        :param p: from 0 to 100
+        :return: the latency below which p percent of the latencies are, in seconds
+        """
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+
+class LoadClient:
+    """
+    A simulated player without a window. It keeps track of its own hand and the current card from the
+    PLAYER_CARDS_INFO and STATE_DELTA packets, and plays a legal move as soon as it's its turn.
+    """
+
+    def __init__(self, name, room_name, stats: LoadStats, rng: random.Random):
+        self.name = name
+        self.room_name = room_name
+        self.stats = stats
+        self.random = rng
+        self.reader = None  # type:asyncio.StreamReader
+        self.writer = None  # type:asyncio.StreamWriter
+        self.frames = FrameReader()
+        self.is_admin = False
+        self.seat = None  # Index in the players of the room, learnt from the last PLAYER_CARDS_INFO packet
+        self.hand = []  # type:list[int] # The ids of the cards in hand
+        self.curr_card_id = None
+        self.curr_card_color = None
+        self.turn_seat = None
+        self.sent_at = None  # When the move that hasn't been answered yet was sent
+
+    async def connect(self, host, port):
+        """
+        Connect and log in
+        :return: True if the login succeeded
+        """
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.send(encode_client_header(PacketType.LOGIN.value, self.name, self.room_name))
+        packet = await self.recv_packet()
+        if packet is None:
+            return False
+        packet_type, self.is_admin = decode_login_response(packet)
+        return packet_type == PacketType.LOGIN_SUCCESS.value
+
+    def send(self, packet):
+        self.writer.write(frame_packet(packet))
+
+    async def recv_packet(self):
+        """
+        :return: the next whole packet, or None if the server closed the connection
+        """
+        while True:
+            packet = self.frames.next_packet()
+            if packet is not None:
+                self.stats.packets += 1
+                self.stats.bytes += len(packet)
+                return packet
+            data = await self.reader.read(RECV_BUFFER_SIZE)
+            if len(data) == 0:
+                return None
+            self.frames.feed(data)
+
+    def start_game(self):
+        self.send(encode_client_header(PacketType.START_GAME.value, self.name, self.room_name))
+
+    def apply_state(self, packet, packet_type):
+        """
+        Update what the player knows from a PLAYER_CARDS_INFO or STATE_DELTA packet
+        """
+        if packet_type == PacketType.PLAYER_CARDS_INFO.value:
+            state = decode_game_state(packet)
+            self.curr_card_id, self.curr_card_color = state['curr_card_id'], state.get('curr_card_color')
+            self.turn_seat = None
+            for seat, player_info in enumerate(state['players']):
+                if player_info['cards'] is not None:
+                    self.seat = seat
+                    self.hand = player_info['cards']
+                if player_info['turn']:
+                    self.turn_seat = seat
+        else:
+            delta = decode_state_delta(packet)
+            if delta['played_seat'] == self.seat:
+                self.hand.remove(delta['played_card_id'])
+            for seat, _, card_ids in delta['draws']:
+                if card_ids is not None:
+                    self.hand += card_ids
+            self.curr_card_id, self.curr_card_color = delta['curr_card_id'], delta['curr_card_color']
+            self.turn_seat = delta['turn_seat']
+
+    def play_move(self):
+        """
+        Play a random legal card, or draw a card if there is none
+        """
+        if self.curr_card_color == 0:
+            # The first card of the round is a wild card whose color hasn't been chosen, any card can be played
+            playable = self.hand
+        else:
+            playable = [card_id for card_id in self.hand if can_play(self.curr_card_id, card_id, self.curr_card_color)]
+        if playable:
+            card_id = self.random.choice(playable)
+            color = self.random.randint(1, 4) if CARD_IS_WILD[card_id] else CARD_COLORS[card_id]
+            self.send(encode_play_card(self.name, self.room_name, card_id, color))
+        else:
+            self.send(encode_client_header(PacketType.DRAW_CARD.value, self.name, self.room_name))
+        self.sent_at = time.perf_counter()
+
+    async def play(self, deadline):
+        """
+        Receive packets and play until the deadline
+        :param deadline: time.perf_counter() value at which to stop
+        :return:
+        """
+        while time.perf_counter() < deadline:
+            try:
+                packet = await asyncio.wait_for(self.recv_packet(), deadline - time.perf_counter())
+            except asyncio.TimeoutError:
+                break
+            if packet is None:
+                self.stats.errors += 1
+                break
+            packet_type = get_packet_type(packet)
+            if packet_type in (PacketType.PLAYER_CARDS_INFO.value, PacketType.STATE_DELTA.value):
+                self.apply_state(packet, packet_type)
+                if self.sent_at is not None:
+                    # The first state after a move is the broadcast of that move
+                    self.stats.latencies.append(time.perf_counter() - self.sent_at)
+                    self.stats.moves += 1
+                    self.sent_at = None
+                if self.turn_seat == self.seat and self.seat is not None:
+                    self.play_move()
+            elif packet_type == PacketType.FINAL_WIN.value:
+                self.sent_at = None
+                if self.is_admin:
+                    self.stats.games += 1
+                    self.start_game()
+        self.writer.close()
+
+
+async def run_room(index, args, stats, semaphore, deadline):
+    """
+    Fill one room with simulated players, start the game and play until the deadline
+    :param index: the number of the room
+    :return:
+    """
+    room_name = f'{args.prefix}{index}'
+    rng = random.Random(args.seed * 100003 + index)
+    clients = [LoadClient(f'p{i}', room_name, stats, rng) for i in range(args.players)]
+    try:
+        async with semaphore:
+            # The first player creates the room and becomes its administrator, so he has to log in first
+            for client in clients:
+                if not await client.connect(args.host, args.port):
+                    stats.errors += 1
+                    return
+    except OSError:
+        stats.errors += 1
+        return
+    clients[0].start_game()
+    await asyncio.gather(*(client.play(deadline) for client in clients))
+
+
+async def generate_load(args):
+    """
+    Run the simulated players of all the rooms
+    :return: LoadStats
+    """
+    stats = LoadStats()
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(run_room(i, args, stats, semaphore, deadline) for i in range(args.rooms)))
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def print_report(stats, args):
+    print(f'{args.rooms} rooms, {args.rooms * args.players} players, {stats.errors} errors, {stats.games} games finished')
+    print(f'{stats.moves} moves in {stats.seconds:.1f} s: {stats.moves / stats.seconds:.0f} moves/s, '
+          f'{stats.packets / stats.seconds:.0f} packets/s, {stats.bytes / stats.seconds / 1024:.0f} KiB/s received')
+    print(f'move to broadcast latency: p50 {stats.percentile(50) * 1000:.2f} ms, p99 {stats.percentile(99) * 1000:.2f} ms, '
+          f'max {stats.percentile(100) * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless players that load a running Uno server and measure it')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8888)
+    parser.add_argument('--rooms', type=int, default=100)
+    parser.add_argument('--players', type=int, default=4, choices=[2, 3, 4], help='players in each room')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to play')
+    parser.add_argument('--prefix', default='load', help='prefix of the room names, so that several generators can share a server')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print_report(asyncio.run(generate_load(args)), args)
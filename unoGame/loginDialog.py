@@ -4,6 +4,8 @@ import tkinter as tk
 from tkinter import messagebox
 
 from protocal import PacketType, build_packet_header_client
+from framing import FramedSocket
+from codec import decode_login_response
 from player import Player
 
 
@@ -63,17 +65,17 @@ class LoginDialog:
         if self.var_player_name.get() == '':
             messagebox.showerror(title='Error', message='Empty name')
             return
-        self.client.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.client.client_socket = FramedSocket(client_socket)
         player_name = self.var_player_name.get()
         room_name = self.var_room.get()
         try:
-            self.client.client_socket.connect((self.var_server_ip.get(), self.var_server_port.get()))
+            client_socket.connect((self.var_server_ip.get(), self.var_server_port.get()))
             # packet = struct.pack(f'>III{len(room_name)}s{len(player_name)}s', PacketType.LOGIN.value, len(room_name), len(player_name), room_name.encode('ASCII'), player_name.encode('ASCII'))
             packet = build_packet_header_client(PacketType.LOGIN.value, player_name, room_name)
             self.client.client_socket.send(packet)
-            packet = self.client.client_socket.recv(1024)
-            packet_type, is_admin = struct.unpack('>Ic', packet[:5])
-            is_admin = is_admin == b'A'
+            packet = self.client.client_socket.recv_packet()
+            packet_type, is_admin = decode_login_response(packet)
             if packet_type == PacketType.LOGIN_SUCCESS.value:
                 self.client.player = Player(self.var_player_name.get(), self.var_room.get(), self.client.client_socket, None, is_admin)
                 self.root.destroy()
@@ -0,0 +1,196 @@
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ADDRESS = '127.0.0.1'  # The metrics are only served locally
+METRICS_PORT = 9888
+# Upper bounds of the buckets of the latency histograms, in seconds
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def format_labels(label_names, label_values, extra=''):
+    labels = [f'{name}="{value}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        labels.append(extra)
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+class Metric:
+    """
+    A metric with a value for each combination of label values
+    """
+    metric_type = 'untyped'
+
+    def __init__(self, name, documentation, label_names=()):
+        """
+        :param name: the name of the metric
+        :param documentation: the help text
+        :param label_names: the names of the labels, for example ('type',)
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values = {}  # The value for each tuple of label values
+        self.lock = threading.Lock()
+
+    def render(self):
+        """
+        :return: the lines of the metric in the Prometheus text format
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        with self.lock:
+            values = sorted(self.values.items())
+        for label_values, value in values:
+            lines += self.render_value(label_values, value)
+        return lines
+
+    def render_value(self, label_values, value):
+        return [f'{self.name}{format_labels(self.label_names, label_values)} {value}']
+
+
+class Counter(Metric):
+    metric_type = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. The value is read from a function when the metrics are rendered.
+    """
+    metric_type = 'gauge'
+
+    def __init__(self, name, documentation, function):
+        """
+        :param function: returns the current value
+        """
+        super().__init__(name, documentation)
+        self.function = function
+
+    def render(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}', f'{self.name} {self.function()}']
+
+
+class Histogram(Metric):
+    """
+    Counts observations, such as latencies, in buckets
+    """
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.values.get(label_values)
+            if counts is None:
+                # A count for each bucket and one for bigger values, then the sum of the observed values
+                counts = self.values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def time(self, *label_values):
+        """
+        :return: a context manager that observes the time its block takes
+        """
+        return Timer(self, label_values)
+
+    def render_value(self, label_values, counts):
+        lines = []
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            total += count
+            le = f'le="{bound}"'
+            lines.append(f'{self.name}_bucket{format_labels(self.label_names, label_values, le)} {total}')
+        labels = format_labels(self.label_names, label_values)
+        lines.append(f'{self.name}_sum{labels} {counts[-1]}')
+        lines.append(f'{self.name}_count{labels} {total}')
+        return lines
+
+
+class Timer:
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+
+
+class Registry:
+    """
+    All the metrics of a process
+    """
+
+    def __init__(self):
+        self.metrics = {}  # type:dict[str,Metric]
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """
+        :return: every metric in the Prometheus text format
+        """
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+PACKETS_RECEIVED = REGISTRY.register(Counter('uno_packets_received_total', 'Packets received from clients', ('type',)))
+BYTES_RECEIVED = REGISTRY.register(Counter('uno_bytes_received_total', 'Bytes received from clients, with the length headers'))
+BYTES_SENT = REGISTRY.register(Counter('uno_bytes_sent_total', 'Bytes sent to clients, with the length headers'))
+PACKET_LATENCY = REGISTRY.register(Histogram('uno_packet_handle_seconds', 'Time to handle a packet received from a client', ('type',)))
+SHUFFLE_LATENCY = REGISTRY.register(Histogram('uno_shuffling_cards_seconds', 'Time to shuffle and deal the cards of a round'))
+BROADCAST_LATENCY = REGISTRY.register(Histogram('uno_broadcast_seconds', 'Time to hand a packet over to every player of a room', ('kind',)))
+
+
+# Other pages of the metrics server: a function for each path that returns something that can be written as JSON
+REPORTS = {}
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/metrics':
+            body = REGISTRY.render().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path in REPORTS:
+            body = json.dumps(REPORTS[self.path](), indent=2).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are not worth a line in the log
+
+
+def start_metrics_server(address=METRICS_ADDRESS, port=METRICS_PORT):
+    """
+    Serve the metrics at http://address:port/metrics in a background thread
+    :return: the ThreadingHTTPServer
+    """
+    http_server = ThreadingHTTPServer((address, port), MetricsRequestHandler)
+    http_server.daemon_threads = True
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    return http_server
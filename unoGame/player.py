@@ -1,15 +1,17 @@
 import socket
 
+from hand import Hand
+
 
 class Player:
-    def __init__(self, name=None, room_name=None, client_socket=None, client_address=None, is_admin=False):
+    def __init__(self, name=None, room_name=None, client_socket=None, client_address=None, is_admin=False, compact_hand=False):
         self.name = name #type:str
         self.client_socket = client_socket  # type:socket.socket
         self.client_address = client_address
         self.room_name = room_name
         self.room = None
         self.score = 0
-        self.cards_in_hand = []
+        self.cards_in_hand = Hand() if compact_hand else []  # A Hand keeps huge hands fast on the server
 
         self.is_admin = is_admin
 
@@ -1,18 +1,16 @@
-import random
 import tkinter as tk
 from tkinter.ttk import Combobox
 
 from player import Player
 from constant import *
-from PIL import ImageTk, Image
-from tkinter import Label
 from card import *
+from imageCache import get_photo_image
 from protocal import *
 import tkinter.simpledialog as simpledialog
 
 
 class PlayerView(tk.Frame):
-    def __init__(self, master: tk.Tk, width, height, player: Player = None, bg=PLAYER_VIEW_BACKGROUND, position='top'):
+    def __init__(self, master: tk.Tk, width, height, player: Player = None, bg=PLAYER_VIEW_BACKGROUND, position='top', render_mode=HAND_RENDER_MODE):
         super().__init__(master, width=width, height=height)
         self.master = master
         self.width = width
@@ -30,13 +28,24 @@ class PlayerView(tk.Frame):
         self.line_canvas = None
         self.update_player()
         self.angle = 0
-        self.images = []
-        self.image_labels = []  # type:[tk.Label]
+        self.render_mode = render_mode  # 'canvas' or 'labels', see HAND_RENDER_MODE
+        self.image_labels = []  # type:[tk.Label] # A pool of labels, label i shows card i of the hand
+        self.card_items = []  # type:[int] # A pool of canvas image items, item i shows card i of the hand
+        self.item_indexes = {}  # type:dict[int,int] # The index of each canvas item in card_items
+        self.slots = []  # What each pooled label or item shows: (image name, x, y), or None if it's hidden
+        self.hand_canvas = None  # type:tk.Canvas
+        if render_mode == 'canvas':
+            # The cards are drawn above the line under the name, with the same coordinates as in the frame
+            self.hand_canvas = tk.Canvas(self, width=width, height=self.name_y - 2, highlightthickness=0, bd=0)
+            self.hand_canvas.place(x=0, y=0)
+            if position == 'bottom':
+                self.hand_canvas.bind('<Button-1>', self.on_canvas_click)
         self.combobox = None
 
         # if self.position == 'bottom':
         #     self.init_combobox()
         self.turn = False
+        self.play_in_flight = False  # Set when a card is played, until the next state from the server, so a second click plays nothing
         # self.init_combobox()
         if position == 'top':
             self.angle = 180
@@ -134,40 +143,128 @@ class PlayerView(tk.Frame):
                 self.name_label.place(x=self.name_x, y=self.name_y)
                 self.score_label.place(x=self.score_x, y=self.score_y)
 
-        for image_label in self.image_labels:
-            image_label.place_forget()
-        self.image_labels.clear()
         if self.player is None:
+            self.render_cards([], [])
             return
         self.score_label['text'] = f'Score: {self.player.score}'
         cards = self.player.cards_in_hand
         card_number = len(cards)
-        if card_number == 0:
-            return
         if self.position != 'bottom':
-            cards = [Card(None, None, 'N.png') for _ in range(card_number)]
-        coords = self.get_card_coords(card_number)
-        for i in range(card_number):
-            image = Image.open(cards[i].image_name)
-            resized_image = image.resize((CARD_WIDTH, CARD_HEIGHT))
-            image = ImageTk.PhotoImage(resized_image)
-            self.images.append(image)
-            label = tk.Label(self, image=image)
-            label.place(x=coords[i][0], y=coords[i][1])
+            cards = [HIDDEN_CARD] * card_number
+        coords = self.get_card_coords(card_number) if card_number > 0 else []
+        self.render_cards([card.image_name for card in cards], coords)
+
+    def render_cards(self, image_names, coords):
+        """
+        Show the cards of the seat with the render mode of the view
+        :param image_names: the image of each card
+        :param coords: the [x, y] of each card
+        :return:
+        """
+        if self.render_mode == 'canvas':
+            self.render_canvas(image_names, coords)
+        else:
+            self.render_labels(image_names, coords)
+
+    def render_canvas(self, image_names, coords):
+        """
+        Draw the cards as image items on the canvas of the seat. Like the labels, the items are pooled and only the
+        items whose slot has changed are updated, with coords and itemconfig, so the canvas redraws only those cards.
+        :param image_names: the image of each card
+        :param coords: the [x, y] of each card
+        :return:
+        """
+        canvas = self.hand_canvas
+        # Grow the pool, later items are drawn above earlier ones as the cards overlap from left to right
+        while len(self.card_items) < len(image_names):
+            item = canvas.create_image(0, 0, anchor=tk.NW, state=tk.HIDDEN)
+            self.item_indexes[item] = len(self.card_items)
+            self.card_items.append(item)
+            self.slots.append(None)
+
+        for i, (image_name, (x, y)) in enumerate(zip(image_names, coords)):
+            slot = (image_name, x, y)
+            old_slot = self.slots[i]
+            if old_slot == slot:
+                continue
+            item = self.card_items[i]
+            if old_slot is None:
+                canvas.itemconfig(item, image=get_photo_image(image_name, (CARD_WIDTH, CARD_HEIGHT)), state=tk.NORMAL)
+            elif old_slot[0] != image_name:
+                canvas.itemconfig(item, image=get_photo_image(image_name, (CARD_WIDTH, CARD_HEIGHT)))
+            if old_slot is None or old_slot[1:] != slot[1:]:
+                canvas.coords(item, x, y)
+            self.slots[i] = slot
+
+        # Hide the items left over from a bigger hand, they are kept for later
+        for i in range(len(image_names), len(self.card_items)):
+            if self.slots[i] is not None:
+                canvas.itemconfig(self.card_items[i], state=tk.HIDDEN)
+                self.slots[i] = None
+
+    def render_labels(self, image_names, coords):
+        """
+        Show the cards with the pooled labels. A label is only created when the hand is bigger than it has ever been,
+        and a label is only touched when the image or the position of its slot has changed, so the number of widgets
+        stays the same however long the game is.
+        :param image_names: the image of each card
+        :param coords: the [x, y] of each card
+        :return:
+        """
+        # Grow the pool, later labels are stacked above earlier ones as the cards overlap from left to right
+        while len(self.image_labels) < len(image_names):
+            label = tk.Label(self)
             if self.position == 'bottom':
-                label.bind('<Button-1>', self.on_card_click)
+                label.bind('<Button-1>', self.on_label_click)
             self.image_labels.append(label)
+            self.slots.append(None)
+
+        for i, (image_name, (x, y)) in enumerate(zip(image_names, coords)):
+            slot = (image_name, x, y)
+            old_slot = self.slots[i]
+            if old_slot == slot:
+                continue
+            label = self.image_labels[i]
+            if old_slot is None or old_slot[0] != image_name:
+                # The PhotoImage is cached, so the label keeps it alive
+                label['image'] = get_photo_image(image_name, (CARD_WIDTH, CARD_HEIGHT))
+            if old_slot is None or old_slot[1:] != slot[1:]:
+                label.place(x=x, y=y)
+            self.slots[i] = slot
+
+        # Hide the labels left over from a bigger hand, they are kept for later
+        for i in range(len(image_names), len(self.image_labels)):
+            if self.slots[i] is not None:
+                self.image_labels[i].place_forget()
+                self.slots[i] = None
 
-    def on_card_click(self, event):
-        if not self.turn:
+    def on_label_click(self, event):
+        self.on_card_click(self.image_labels.index(event.widget))
+
+    def on_canvas_click(self, event):
+        # The topmost card under the pointer, the cards on the right overlap the ones on their left
+        indexes = [self.item_indexes[item] for item in self.hand_canvas.find_overlapping(event.x, event.y, event.x, event.y)
+                   if item in self.item_indexes and self.slots[self.item_indexes[item]] is not None]
+        if indexes:
+            self.on_card_click(max(indexes))
+
+    def on_card_click(self, card_index):
+        """
+        Play a card of the hand if it's my turn and the card can be played
+        :param card_index: the index of the clicked card in the hand
+        :return:
+        """
+        if not self.turn or self.play_in_flight:
+            return
+        if card_index >= len(self.player.cards_in_hand):
             return
-        label_index = self.image_labels.index(event.widget)
-        curr_clicked_card_id = self.player.cards_in_hand[label_index].id
+        curr_clicked_card_id = self.player.cards_in_hand[card_index].id
 
         if not can_play(self.deck.curr_card_id, curr_clicked_card_id, self.deck.curr_card_color):
             return
 
         self.turn = False
+        self.play_in_flight = True
         if self.after_toggle_id is not None:
             self.after_cancel(self.after_toggle_id)
             self.after_toggle_id = None
@@ -180,11 +277,8 @@ class PlayerView(tk.Frame):
             curr_clicked_card_color = ['b', 'g', 'r', 'y'].index(choice) + 1
         packet = build_play_card_packet(self.player.name, self.player.room_name, curr_clicked_card_id, curr_clicked_card_color)
         self.player.client_socket.send(packet)
-        for card in self.player.cards_in_hand:
-            if card.id == curr_clicked_card_id:
-                self.player.cards_in_hand.remove(card)
-                break
-        if len(self.player.cards_in_hand) == 1:
+        # The played card is removed from the hand when the state delta from the server arrives
+        if len(self.player.cards_in_hand) - 1 == 1:
             packet = build_call_uno_packet(self.player.name, self.player.room_name)
             self.player.client_socket.send(packet)
 
@@ -196,9 +290,7 @@ class PlayerView(tk.Frame):
         toast.wm_overrideredirect(True)  # Remove window decorations
         toast.wm_geometry("+{}+{}".format(self.name_label.winfo_rootx() + 50, self.name_label.winfo_rooty() - 20))
 
-        image = Image.open('images/LOGO.png')
-        image = image.resize((60, 40))
-        image = ImageTk.PhotoImage(image)
+        image = get_photo_image('images/LOGO.png', (60, 40))
 
         label = tk.Label(toast, image=image)
         label.image = image
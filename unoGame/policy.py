@@ -0,0 +1,153 @@
+import random
+from abc import ABC, abstractmethod
+
+from card import CARD_IS_WILD, CARD_COLORS, CARD_POINTS, get_playable_mask
+from hand import Hand
+
+
+def get_playable_cards(engine, player):
+    """
+    Get the cards in a player's hand that can be played now
+    :param engine: the GameEngine of the room
+    :param player: the player
+    :return: a list of cards
+    """
+    if engine.curr_card_color == 0:
+        # The first card of the round is a wild card whose color hasn't been chosen, the player chooses it with his card
+        return list(player.cards_in_hand)
+    if isinstance(player.cards_in_hand, Hand):
+        mask = player.cards_in_hand.get_playable_mask(engine.curr_card.id, engine.curr_card_color)
+    else:
+        mask = get_playable_mask(engine.curr_card.id, engine.curr_card_color)
+    return [card for card in player.cards_in_hand if mask >> card.id & 1]
+
+
+def get_best_color(cards):
+    """
+    The color that a player holds the most cards of
+    :param cards: the cards in the hand
+    :return: a color from 1 to 4
+    """
+    counts = [0] * 5
+    for card in cards:
+        counts[CARD_COLORS[card.id]] += 1
+    counts[0] = -1  # wild cards have no color
+    return counts.index(max(counts))
+
+
+class Policy(ABC):
+    """
+    Decides the moves of a player who is not a person: simulations and bot players use a policy.
+    A subclass must implement choose_move.
+    """
+    name = 'policy'
+
+    def __init__(self, rng=None):
+        """
+        :param rng: a random.Random, so that simulations can be repeated
+        """
+        self.random = rng if rng is not None else random.Random()
+
+    @abstractmethod
+    def choose_move(self, engine, player):
+        """
+        Choose what the player does in his turn
+        :param engine: the GameEngine of the room
+        :param player: the player whose turn it is
+        :return: (card id, color) to play a card, or None to draw a card
+        """
+
+    def choose_color(self, engine, player, card):
+        """
+        The color of a card when it's played, a wild card takes the color the player holds the most of
+        :return: a color from 1 to 4
+        """
+        if CARD_IS_WILD[card.id]:
+            return get_best_color(player.cards_in_hand)
+        return CARD_COLORS[card.id]
+
+
+class RandomPolicy(Policy):
+    """
+    Plays a random card that can be played, and draws a card if there is none
+    """
+    name = 'random'
+
+    def choose_move(self, engine, player):
+        cards = get_playable_cards(engine, player)
+        if not cards:
+            return None
+        card = self.random.choice(cards)
+        return card.id, self.choose_color(engine, player, card)
+
+
+class GreedyPolicy(Policy):
+    """
+    Plays the card that is worth the most points, so that the hand is worth as little as possible if somebody else wins
+    """
+    name = 'greedy'
+
+    def choose_move(self, engine, player):
+        cards = get_playable_cards(engine, player)
+        if not cards:
+            return None
+        card = max(cards, key=lambda c: CARD_POINTS[c.id])
+        return card.id, self.choose_color(engine, player, card)
+
+
+class ColorCountingPolicy(Policy):
+    """
+    Remembers the cards that have been played. It plays into the color that the opponents are least likely to hold,
+    that is, the color with the fewest cards that are neither in its hand nor in the discard pile,
+    and keeps its wild cards until it has nothing else to play.
+    """
+    name = 'color_counting'
+
+    def count_unseen_colors(self, engine, player):
+        """
+        :return: the number of cards of each color that the player hasn't seen, indexed by color
+        """
+        unseen = [0, 25, 25, 25, 25]  # Every color has 25 cards in the deck
+        for cards in (player.cards_in_hand, engine.discard_pile):
+            for card in cards:
+                unseen[CARD_COLORS[card.id]] -= 1
+        return unseen
+
+    def choose_move(self, engine, player):
+        cards = get_playable_cards(engine, player)
+        if not cards:
+            return None
+        unseen = self.count_unseen_colors(engine, player)
+        colored_cards = [card for card in cards if not CARD_IS_WILD[card.id]]
+        if colored_cards:
+            card = min(colored_cards, key=lambda c: (unseen[CARD_COLORS[c.id]], -CARD_POINTS[c.id]))
+        else:
+            card = cards[0]
+        return card.id, self.choose_color(engine, player, card)
+
+    def choose_color(self, engine, player, card):
+        if not CARD_IS_WILD[card.id]:
+            return CARD_COLORS[card.id]
+        # The color it holds the most of, and of those the one the opponents have the fewest of
+        counts = [0] * 5
+        for c in player.cards_in_hand:
+            counts[CARD_COLORS[c.id]] += 1
+        unseen = self.count_unseen_colors(engine, player)
+        return max(range(1, 5), key=lambda color: (counts[color], -unseen[color]))
+
+
+# Policies by name
+POLICIES = {
+    RandomPolicy.name: RandomPolicy,
+    GreedyPolicy.name: GreedyPolicy,
+    ColorCountingPolicy.name: ColorCountingPolicy,
+}
+
+
+def get_policy(name, rng=None):
+    """
+    :param name: the name of a policy
+    :param rng: a random.Random
+    :return: a new policy object
+    """
+    return POLICIES[name](rng)
@@ -15,6 +15,7 @@ class PacketType(Enum):
     DRAW_CARD = 10
     CALL_UNO = 11
     FINAL_WIN = 12
+    STATE_DELTA = 13
 
 
 def get_start_game_packet_server():
@@ -1,288 +1,151 @@
-import random
-import struct
-from typing import Dict
+import sys
 
-from card import *
-from constant import CARDS_CSV
-from player import Player
-from protocal import *
+from bot import BotPlayer, BOT_MOVE_LIMIT, create_bots
+from engine import GameEngine
+from framing import FRAME_HEADER
+from metrics import BYTES_SENT, SHUFFLE_LATENCY, BROADCAST_LATENCY
+from hand import Hand
+from roomActor import RoomActor
 
 
-class Room:
+class Room(GameEngine):
     """
-    Room class
+    Room class. The rules are in GameEngine, the room only sends the packets of the engine to the client sockets,
+    and lets the bot players in the room play their turns.
     """
 
-    def __init__(self, name=None):
-        self.name = name
-        self.players = []  # type:list[Player] # The players in the room
-        self.cards = []  # cards in Deck
-        self.discard_pile = []  # Discard Pile
-        self.curr_card = None  # type:Card # The current card, which can also be said to be the last card played, That's the top of the discard pile
-        self.curr_card_color = None  # the color of the current card
-        self.curr_player = None  # type:Player # The current player, that is, the player who is going to play
-        self.clockwise = True  # Clockwise(True) or counterclockwise(False)
-        self.started = False  # Is the game started?
-
-    def is_full(self):
-        """
-        Determine if the room is full
-        :return: True or False
-        """
-        return len(self.players) >= 4
-
-    def player_exists(self, player_name):
+    def __init__(self, name=None, executor=None):
         """
-        Determine if the player's name already exists
-        :param player_name:
-        :return: True or False
+        :param name: name of the room
+        :param executor: the pool of workers that runs the commands of the rooms, see RoomActor
         """
+        super().__init__(name, record_events=False)
+        self.actor = RoomActor(executor)  # The server changes the room only through commands submitted to the actor
+        self.closed = False  # Whether the server has closed the room
+        self.running_bots = False  # Whether run_bots is making the moves of the bots right now
 
-        for p in self.players:
-            if p.name == player_name:
-                return True
-        return False
-
-    def add_player(self, player):
+    def deliver(self, player, packet):
         """
-        Add a player
-        :param player: a new player
+        Send a packet to a player. send() only queues it on the connection, so a slow client doesn't hold up the other players.
+        :param player: the receiver
+        :param packet: the packet
         :return:
         """
-        player.set_room(self)
-        self.players.append(player)
-        # Because the player in the room has updated, notify the other players
-        names_str = ''
-        for player in self.players:
-            names_str += player.name + ';'
-        names_str = names_str[:-1]
-        packet = struct.pack(f'>II{len(names_str)}s', PacketType.PLAYER_LIST.value, len(names_str), names_str.encode('ASCII'))
-        for p in self.players:
-            if p.name != player.name:
-                p.client_socket.send(packet)
+        if player.client_socket is not None:
+            BYTES_SENT.inc(amount=FRAME_HEADER.size + len(packet))
+            player.client_socket.send(packet)
 
-    def shuffling_cards(self):
-        """
-        shuffle cards
-        :return:
-        """
-        self.cards = read_cards_from_csv()  # type:list[Card] # Re-read all card information
-        random.shuffle(self.cards)  # Shuffle the order of the cards
-        self.curr_player = self.get_admin_player()  # The next player to play is the caretaker of the room
-        # Each player is dealt seven cards
-        for i in range(7):
-            for player in self.players:
-                card = self.cards.pop()
-                player.cards_in_hand.append(card)
-        self.started = True
+    def broadcast(self, packet, exclude=None):
+        with BROADCAST_LATENCY.time('packet'):
+            super().broadcast(packet, exclude)
 
-        # Start discarding the pile
-        self.curr_card = self.cards.pop()
-        self.discard_pile.append(self.curr_card)
+    def broadcast_state(self, first=False):
+        with BROADCAST_LATENCY.time('state'):
+            super().broadcast_state(first)
 
-        if self.curr_card.id in [10, 30, 50, 70]:
-            # the current player misses a turn
-            self.curr_player = self.get_next_player()
-        elif self.curr_card.id in [11, 31, 51, 71]:
-            # play proceeds counterclockwise
-            self.clockwise = False
-        elif self.curr_card.id in [12, 32, 52, 72]:
-            # the player to the left of the current player draws two cards and misses a turn
-            self.curr_player = self.get_next_player()
-            self.curr_player.cards_in_hand.append(self.cards.pop())
-            self.curr_player.cards_in_hand.append(self.cards.pop())
-            self.curr_player = self.get_next_player()
-        elif self.curr_card.id == 80:
-            pass
-        elif self.curr_card.id == 90:
-            # Card is returned to the deck, then a new card is laid down into the discard pile (deck may be reshuffled first if needed)
-            while self.curr_card.id == 90:
-                self.discard_pile.remove(self.curr_card)
-                self.cards.append(self.curr_card)
-                random.shuffle(self.cards)
-                self.curr_card = self.cards.pop()
-                self.discard_pile.append(self.curr_card)
-        if not is_wild_card(self.curr_card.id):
-            self.curr_card_color = get_card_color_by_id(self.curr_card.id)
-        else:
-            self.curr_card_color = 0
-        #  Sends the current game state information to each player
-        for player in self.players:
-            packet = get_game_state_packet_server(self, True)
-            player.client_socket.send(packet)
+    def broadcast_delta(self, played=None):
+        with BROADCAST_LATENCY.time('delta'):
+            super().broadcast_delta(played)
 
-    def get_admin_player(self):
-        for player in self.players:
-            if player.is_admin is True:
-                return player
+    def shuffling_cards(self):
+        with SHUFFLE_LATENCY.time():
+            super().shuffling_cards()
 
-    def get_next_player(self):
+    def get_memory_footprint(self):
         """
-        Get the next player.
-        :return:
+        Estimate the memory used by the room. The Card objects are shared by every room, so only the containers count.
+        :return: a dictionary of the sizes
         """
-        if self.curr_player is None:
-            return self.get_admin_player()
-        else:
-            if self.clockwise:
-                return self.players[(self.players.index(self.curr_player) + 1) % len(self.players)]
+        hand_bytes = 0
+        hand_cards = 0
+        queued_packets = 0
+        for player in self.players:
+            cards = player.cards_in_hand
+            hand_cards += len(cards)
+            if isinstance(cards, Hand):
+                hand_bytes += sys.getsizeof(cards.cards_by_id) + sum(sys.getsizeof(c) for c in cards.cards_by_id if c is not None)
             else:
-                return self.players[(self.players.index(self.curr_player) + len(self.players) - 1) % len(self.players)]
-
-    def reset_game(self, clean_score=False):
+                hand_bytes += sys.getsizeof(cards)
+            outbound = getattr(player.client_socket, 'outbound', None)
+            if outbound is not None:
+                queued_packets += outbound.qsize()
+        container_bytes = sys.getsizeof(self.cards) + sys.getsizeof(self.discard_pile) + sys.getsizeof(self.players) + sys.getsizeof(self.seats)
+        return {
+            'players': len(self.players),
+            'deck_cards': len(self.cards),
+            'discard_pile_cards': len(self.discard_pile),
+            'hand_cards': hand_cards,
+            'queued_packets': queued_packets,
+            'queued_commands': len(self.actor.commands),
+            'bytes': container_bytes + hand_bytes,
+        }
+
+    def teardown(self):
         """
-        reset the game.
-        :param clean_score: whether score records are cleared
+        Let go of everything the room holds when it is closed: players, their sockets and all the lists of cards
         :return:
         """
-
-        self.started = True
-        self.curr_card = None
-        self.curr_player = None
-        self.clockwise = True
-        self.discard_pile.clear()
         for player in self.players:
-            if clean_score:
-                player.score = 0
             player.cards_in_hand.clear()
-        packet = get_start_game_packet_server()
-        for player in self.players:
-            player.client_socket.send(packet)
-
-    def play_card(self, player_name, card_id, card_color):
-        played_card = None
-        assert self.curr_player.name == player_name
-        # Removes the card played by the player from the cards in his hand
-        for card in self.curr_player.cards_in_hand:
-            if card.id == card_id:
-                played_card = card
-                self.curr_player.cards_in_hand.remove(card)
-                break
-        assert played_card is not None
-
-        self.curr_card = played_card
-        self.curr_card_color = card_color
-        # Add to discard pile
-        self.discard_pile.append(self.curr_card)
-        # Check if the game is over
-        if self.check_game_over():
-            # Calculate the score for the winner
-            self.calculate_score_for_winner()
-            # Check if the player has more than 500 points
-            final_winner = self.check_500()
-            #  if it is,
-            if final_winner is not None:
-                # Sends a game over message to all clients
-                packet = build_game_over_packet_server(final_winner)
-                for player in self.players:
-                    player.client_socket.send(packet)
-                return
-            # Move on to the next round
-            self.reset_game(False)
-            self.shuffling_cards()
-            return
-        # If a regular card is played,
-        if is_regular_card(self.curr_card.id):
-            # The next player to play is the next player
-            self.curr_player = self.get_next_player()
-        # If it's an action card
-        elif is_action_card(self.curr_card.id):
-            # Get the action type
-            action_type = get_card_action_by_id(self.curr_card.id)
-            # If it's a skip card
-            if action_type == CardAction.SKIP.value:
-                # The next player to play is the next player after the next
-                self.curr_player = self.get_next_player()
-                self.curr_player = self.get_next_player()
-            # if it's a reverse card
-            elif action_type == CardAction.REVERSE.value:
-                # Reverse clockwise,
-                self.clockwise = not self.clockwise
-                self.curr_player = self.get_next_player()
-            # if it's a draw two card
-            elif action_type == CardAction.DRAW_TWO.value:
-                # Move on to the next player first
-                self.curr_player = self.get_next_player()
-                # Deal two cards to this player
-                self.check_cards()
-                self.curr_player.cards_in_hand.append(self.cards.pop())
-                self.check_cards()
-                self.curr_player.cards_in_hand.append(self.cards.pop())
-                # Move past this player and on to the next player
-                self.curr_player = self.get_next_player()
-        else:
-            assert is_wild_card(self.curr_card.id)
-            #
-            if self.curr_card.id == 80:
-                self.curr_card_color = card_color
-                self.curr_player = self.get_next_player()
-            else:
-                self.curr_player = self.get_next_player()
-                for _ in range(4):
-                    self.check_cards()
-                    self.curr_player.cards_in_hand.append(self.cards.pop())
-                self.curr_player = self.get_next_player()
-        packet = get_game_state_packet_server(self)
-        for player in self.players:
-            player.client_socket.send(packet)
-
-    def remove_player(self, i):
-        self.players.pop(i)
+            player.client_socket = None
+            player.room = None
+        self.players = []
+        self.seats = {}
+        self.admin_player = None
+        self.cards = []
+        self.discard_pile = []
+        self.drawn_cards = []
+        self.curr_card = None
+        self.curr_seat = None
+        self.final_winner = None
+        self.started = False
+        self.closed = True
 
-    def draw_card(self, player_name):
-        assert player_name == self.curr_player.name
-        self.check_cards()
-        self.curr_player.cards_in_hand.append(self.cards.pop())
-        player_can_play = False
-        for card in self.curr_player.cards_in_hand:
-            card_id = card.id
-            if can_play(self.curr_card.id, card_id, self.curr_card_color):
-                player_can_play = True
-                break
-        if not player_can_play:
-            self.curr_player = self.get_next_player()
-        packet = get_game_state_packet_server(self)
-        for player in self.players:
-            player.client_socket.send(packet)
+    def add_bots(self, policy_name):
+        """
+        Fill the empty seats of the room with bots
+        :param policy_name: the name of the policy of the bots
+        :return:
+        """
+        for bot in create_bots(self, policy_name):
+            self.add_player(bot)
 
-    def call_uno(self, packet):
+    def has_humans(self):
         for player in self.players:
-            player.client_socket.send(packet)
-
-    def check_game_over(self):
-        if len(self.curr_player.cards_in_hand) == 0:
-            return True
+            if not isinstance(player, BotPlayer):
+                return True
         return False
 
-    def calculate_score_for_winner(self):
-        score = 0
-        for player in self.players:
-            if player == self.curr_player:
-                continue
-            score += self.calculate_score_for_player(player)
-        self.curr_player.score += score
+    def run_bots(self):
+        """
+        Make the moves of the bots until it's the turn of a person or the game is over.
+        The moves of the bots call play_card and draw_card, which call run_bots again, so a flag stops the recursion.
+        :return:
+        """
+        if self.running_bots:
+            return
+        self.running_bots = True
+        try:
+            for _ in range(BOT_MOVE_LIMIT):
+                player = self.curr_player
+                if not self.started or self.final_winner is not None or not isinstance(player, BotPlayer) or not self.has_humans():
+                    break
+                player.play_turn(self)
+        finally:
+            self.running_bots = False
+
+    def start_game(self):
+        super().start_game()
+        self.run_bots()
 
-    def calculate_score_for_player(self, player):
-        score = 0
-        for card in player.cards_in_hand:
-            card_id = card.id
-            if is_regular_card(card_id):
-                score += card_id % 10
-            elif is_action_card(card_id):
-                score += 20
-            else:
-                score += 50
-        return score
+    def play_card(self, player_name, card_id, card_color):
+        super().play_card(player_name, card_id, card_color)
+        self.run_bots()
 
-    def check_500(self):
-        for player in self.players:
-            if player.score >= 500:
-                return player
-        return None
+    def draw_card(self, player_name):
+        super().draw_card(player_name)
+        self.run_bots()
 
-    def check_cards(self):
-        if len(self.cards) == 0:
-            for card in self.discard_pile:
-                if card != self.curr_card:
-                    self.cards.append(card)
-            random.shuffle(self.cards)
+    def remove_player(self, i):
+        super().remove_player(i)
+        self.run_bots()
@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, Executor
+
+from metrics import REGISTRY, Histogram, PACKET_LATENCY
+from serverLog import logger, packet_logger
+
+ACTOR_BATCH = 64  # A room gives its worker back to the pool after running this many commands in a row
+
+QUEUE_LATENCY = REGISTRY.register(Histogram('uno_room_queue_seconds', 'Time a command waits in the queue of its room'))
+
+
+class RoomActor:
+    """
+    Runs the commands of one room one at a time, in the order they were submitted.
+    Any thread can submit a command. The commands are run by a shared pool of worker threads, and a room is given to
+    at most one worker at a time, so the state of a room is only ever changed by one thread without any lock on the room,
+    and different rooms run in parallel.
+    """
+
+    def __init__(self, executor: Executor = None):
+        """
+        :param executor: the shared pool of workers. If None, commands run right away in the thread that submits them,
+                         which is what the asyncio server wants, as all its rooms live on the event loop thread.
+        """
+        self.executor = executor
+        self.commands = deque()  # Commands waiting to be run
+        self.lock = threading.Lock()  # Protects commands and scheduled
+        self.scheduled = False  # Whether a worker is running or about to run the commands of this room
+        self.last_command = time.monotonic()  # When the last packet of a client was handled, idle rooms are closed
+
+    def submit(self, function, *args, label=None, log_extra=None):
+        """
+        Queue a command
+        :param function: the command, called with args
+        :param label: the packet type name, the time the command takes is recorded under it
+        :param log_extra: if not None, the command is logged with these fields and the time it took
+        :return: a concurrent.futures.Future of the return value of the command
+        """
+        command = (function, args, Future(), label, log_extra, time.perf_counter())
+        if self.executor is None:
+            self.execute(command)
+            return command[2]
+        with self.lock:
+            self.commands.append(command)
+            if self.scheduled:
+                return command[2]
+            self.scheduled = True
+        self.executor.submit(self.run)
+        return command[2]
+
+    def run(self):
+        """
+        The task of a worker: run the queued commands of the room
+        :return:
+        """
+        for _ in range(ACTOR_BATCH):
+            with self.lock:
+                if not self.commands:
+                    self.scheduled = False
+                    return
+                command = self.commands.popleft()
+            self.execute(command)
+        # Let the other rooms have this worker, and continue later
+        self.executor.submit(self.run)
+
+    def execute(self, command):
+        function, args, future, label, log_extra, submitted = command
+        if label is not None:
+            self.last_command = time.monotonic()
+        start = time.perf_counter()
+        try:
+            result = function(*args)
+        except Exception as e:
+            # A bad packet, such as a card played out of turn, must not stop the room
+            logger.exception('room command failed', extra=log_extra or {})
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        end = time.perf_counter()
+        QUEUE_LATENCY.observe(start - submitted)
+        if label is not None:
+            PACKET_LATENCY.observe(end - start, label)
+        if log_extra is not None:
+            packet_logger.info('packet handled', extra=dict(log_extra, latency_ms=round((end - start) * 1000, 3)))
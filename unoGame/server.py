@@ -1,14 +1,33 @@
+import argparse
+import asyncio
 import logging
 import socket
 import struct
 import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from room import Room
 from player import Player
+from policy import POLICIES
 from constant import *
 from protocal import *
+from codec import decode_client_header, decode_play_card_body, encode_login_response, encode_player_list
+from framing import FramedSocket, FrameReader, FrameTooLarge, frame_packet, FRAME_HEADER, RECV_BUFFER_SIZE, OUTBOUND_BUFFER_LIMIT
+from metrics import REGISTRY, REPORTS, Gauge, PACKETS_RECEIVED, BYTES_RECEIVED, BYTES_SENT, METRICS_PORT, start_metrics_server
+from serverLog import logger, setup_logging, PacketSampler, LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, PACKET_LOG_SAMPLE_RATE
 
 SERVER_ADDRESS = '0.0.0.0'
 SERVER_PORT = 8888
+LISTEN_BACKLOG = 128  # The maximum number of connections waiting to be accepted
+COMPACT_HANDS = True  # Store the cards in hand of players as a Hand instead of a list
+SOCKET_BUFFER_SIZE = 262144  # Kernel send and receive buffer size of each client connection
+ROOM_TTL = 3600  # A room where no client has sent a packet for this many seconds is closed
+FINISHED_ROOM_TTL = 600  # The same for a room whose game is over
+SWEEP_INTERVAL = 60  # Seconds between two checks for idle rooms
+ROOM_WORKERS = 4  # The number of threads that run the commands of the rooms
+REPORT_TIMEOUT = 1  # Seconds the memory report waits for the rooms, a busier room is left out of the report
+MEMORY_GAUGE_INTERVAL = 60  # Seconds the memory gauge reuses the last memory report, so a scrape doesn't visit every room
+PACKET_TYPE_NAMES = {packet_type.value: packet_type.name for packet_type in PacketType}  # The label of each packet type in the metrics
 
 
 class Server:
@@ -16,14 +35,61 @@ class Server:
     Server class
     """
 
-    def __init__(self):
+    def __init__(self, address=SERVER_ADDRESS, port=SERVER_PORT, bot_policy=None, packet_log_rate=PACKET_LOG_SAMPLE_RATE):
         """
         Initialization function
+        :param address: the ip address the server listens on, None for a server that is handed its connections, see shardServer
+        :param port: the port the server listens on
+        :param bot_policy: if set, the empty seats of a room are filled with bots of this policy when the game starts
+        :param packet_log_rate: the fraction of the received packets that are logged
         """
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)  # Server socket
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # Set the port to be reusable
-        self.server_socket.bind((SERVER_ADDRESS, SERVER_PORT))  # Bind the ip address and port of the server
+        self.server_socket = None  # type:socket.socket
+        if address is not None:
+            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)  # Server socket
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # Set the port to be reusable
+            self.server_socket.bind((address, port))  # Bind the ip address and port of the server
         self.rooms = {}  # type:dict[str,Room]
+        self.rooms_lock = threading.Lock()  # Protects self.rooms
+        self.executor = self.create_executor()
+        self.clients = {}  # type:dict[object,Player] # The player who logged in from each client address
+        self.bot_policy = bot_policy
+        self.packet_sampler = PacketSampler(packet_log_rate)
+        self.room_ttl = ROOM_TTL
+        self.finished_room_ttl = FINISHED_ROOM_TTL
+        self.memory_report = {}  # The last memory report and when it was made, read by the memory gauge
+        self.memory_report_time = None
+
+    def register_metrics(self, registry=REGISTRY, reports=REPORTS):
+        """
+        Publish the gauges and reports of this server. Called once for the server of a process, the metrics of a
+        server keep it alive.
+        :param registry: the Registry the gauges are added to
+        :param reports: the reports of the metrics server, the rooms are reported at /rooms
+        :return:
+        """
+        registry.register(Gauge('uno_rooms', 'Rooms on the server', lambda: len(self.rooms)))
+        registry.register(Gauge('uno_players', 'Players connected to the server', lambda: len(self.clients)))
+        registry.register(Gauge('uno_rooms_memory_bytes', 'Estimated memory used by the rooms', self.get_memory_bytes))
+        reports['/rooms'] = self.get_memory_report
+
+    def create_executor(self):
+        """
+        :return: the pool of workers that run the commands of the rooms
+        """
+        return ThreadPoolExecutor(ROOM_WORKERS, thread_name_prefix='room')
+
+    def get_room(self, room_name, create=False):
+        """
+        :param room_name: name of the room
+        :param create: create the room if it doesn't exist
+        :return: the room and whether it was created, the room is None if it doesn't exist
+        """
+        with self.rooms_lock:
+            room = self.rooms.get(room_name)
+            if room is None and create:
+                room = self.rooms[room_name] = Room(room_name, self.executor)
+                return room, True
+            return room, False
 
     def room_exists(self, room_name):
         """
@@ -33,111 +99,447 @@ class Server:
         """
         return room_name in self.rooms
 
-    def handle_client(self, client_socket: socket.socket, client_address):
+    def remove_client(self, client_address):
+        """
+        Remove the player who connected from client_address from his room
+        :param client_address: the address of the disconnected client
+        :return:
+        """
+        player = self.clients.pop(client_address, None)
+        if player is None:
+            return
+        logger.info('client disconnected', extra={'room': player.room_name, 'player': player.name, 'client': str(client_address)})
+        room = player.room
+        if room is not None:
+            room.actor.submit(self.remove_player, room, player)
+
+    def remove_player(self, room, player):
+        """
+        Remove a player from his room, a command of the room. The room is closed when no person is left in it.
+        :param room: the room
+        :param player: the player
+        :return:
+        """
+        if room.closed:
+            return
+        if room.player_exists(player.name) and room.players[room.seats[player.name]] is player:
+            room.remove_player(room.seats[player.name])
+        player.client_socket = None
+        player.room = None
+        if not room.has_humans():
+            self.close_room(room)
+
+    def close_room(self, room):
+        """
+        Remove a room from the server and disconnect the players still in it, a command of the room
+        :param room: the room
+        :return:
+        """
+        with self.rooms_lock:
+            if self.rooms.get(room.name) is room:
+                del self.rooms[room.name]
+        for player in room.players:
+            if player.client_address is not None and self.clients.get(player.client_address) is player:
+                self.clients.pop(player.client_address, None)  # remove_client may have removed it in the meantime
+            if player.client_socket is not None:
+                player.client_socket.close()
+        logger.info('room closed', extra={'room': room.name})
+        room.teardown()
+
+    def expire_room(self, room, ttl):
+        """
+        Close a room if no client has sent a packet to it for ttl seconds, a command of the room
+        :return:
+        """
+        if not room.closed and time.monotonic() - room.actor.last_command > ttl:
+            self.close_room(room)
+
+    def sweep_rooms(self):
+        """
+        Close the rooms that have been idle for longer than their time to live
+        :return: the number of rooms that are going to be closed
+        """
+        now = time.monotonic()
+        with self.rooms_lock:
+            rooms = list(self.rooms.values())
+        expired = 0
+        for room in rooms:
+            ttl = self.finished_room_ttl if room.final_winner is not None else self.room_ttl
+            if now - room.actor.last_command > ttl:
+                room.actor.submit(self.expire_room, room, ttl)
+                expired += 1
+        logger.info(f'{len(rooms)} rooms, {expired} expired')
+        return expired
+
+    def run_sweeper(self):
+        while True:
+            time.sleep(SWEEP_INTERVAL)
+            self.sweep_rooms()
+
+    def start_sweeper(self):
+        threading.Thread(target=self.run_sweeper, daemon=True).start()
+
+    def run_in_room(self, room, function):
+        """
+        Run a function as a command of a room, for a thread that isn't one of the room's own, such as the metrics server
+        :param room: the room
+        :param function: called without arguments
+        :return: a concurrent.futures.Future of the return value of the function
+        """
+        return room.actor.submit(function)
+
+    def get_memory_report(self):
+        """
+        The footprint of each room is measured by a command of the room, so it never reads a room while it changes
+        :return: the estimated memory footprint of each room, see Room.get_memory_footprint
+        """
+        with self.rooms_lock:
+            rooms = list(self.rooms.values())
+        futures = [(room.name, self.run_in_room(room, room.get_memory_footprint)) for room in rooms]
+        deadline = time.monotonic() + REPORT_TIMEOUT
+        report = {}
+        for room_name, future in futures:
+            try:
+                report[room_name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                logger.warning('room too busy for the memory report', extra={'room': room_name})
+        self.memory_report, self.memory_report_time = report, time.monotonic()
+        return report
+
+    def get_memory_bytes(self):
+        """
+        The memory report is made again only if the last one is older than MEMORY_GAUGE_INTERVAL
+        :return: the estimated memory footprint of all the rooms
+        """
+        if self.memory_report_time is None or time.monotonic() - self.memory_report_time > MEMORY_GAUGE_INTERVAL:
+            self.get_memory_report()
+        return sum(footprint['bytes'] for footprint in self.memory_report.values())
+
+    def dispatch_packet(self, client_socket, client_address, packet):
+        """
+        Parse one packet received from a client and respond accordingly.
+        Both the threaded server and the asyncio server call this function, so the game logic is the same in both modes.
+        :param client_socket: client socket, or any object with the send() and close() methods of a socket
+        :param client_address: the address of the client
+        :param packet: the packet received from the client
+        :return: False if the connection to the client should be closed, otherwise True
+        """
+        # Extract the type of packet, the room name and the player name from the packet, and the offset of the rest of it
+        try:
+            packet_type, room_name, player_name, offset = decode_client_header(packet)
+        except (struct.error, UnicodeDecodeError):
+            logger.warning('malformed packet, connection dropped', extra={'client': str(client_address)})
+            return False
+        type_name = PACKET_TYPE_NAMES.get(packet_type, 'UNKNOWN')  # One label for every unknown type, a client can't add labels
+        PACKETS_RECEIVED.inc(type_name)
+        BYTES_RECEIVED.inc(amount=FRAME_HEADER.size + len(packet))
+        log_extra = None
+        if self.packet_sampler.sample():
+            log_extra = {'room': room_name, 'player': player_name, 'packet_type': type_name}
+        # The room runs the commands one at a time, in the order they arrive
+        if packet_type == PacketType.LOGIN.value:  # Client login request, that is, enter the room request
+            keep_open = None
+            while keep_open is None:  # None means that the room was closed in the meantime, so it is created again
+                room, created = self.get_room(room_name, create=True)
+                future = room.actor.submit(self.login, client_socket, client_address, room, player_name, created, label=type_name, log_extra=log_extra)
+                try:
+                    keep_open = future.result()  # The connection thread waits, because the response decides whether to keep the connection
+                except Exception:
+                    return False  # The room has logged the error
+            return keep_open
+        room, _ = self.get_room(room_name)
+        if room is None:
+            return True
+        # Start the game
+        if packet_type == PacketType.START_GAME.value:
+            room.actor.submit(self.start_game, room, label=type_name, log_extra=log_extra)
+        # The player plays a card.
+        elif packet_type == PacketType.PLAY_CARD.value:
+            # Extract the id and color of the cards played from the packet
+            try:
+                card_id, card_color = decode_play_card_body(packet, offset)
+            except struct.error:
+                logger.warning('malformed packet, connection dropped', extra={'client': str(client_address), 'room': room_name, 'player': player_name})
+                return False
+            room.actor.submit(room.play_card, player_name, card_id, card_color, label=type_name, log_extra=log_extra)
+        # The player draws a card from the deck
+        elif packet_type == PacketType.DRAW_CARD.value:
+            room.actor.submit(room.draw_card, player_name, label=type_name, log_extra=log_extra)
+        # The player calls uno
+        elif packet_type == PacketType.CALL_UNO.value:
+            room.actor.submit(room.call_uno, packet, player_name, label=type_name, log_extra=log_extra)
+        return True
+
+    def reply(self, client_socket, packet):
+        """
+        Send a packet to the client that sent the packet being handled
+        :param client_socket: client socket
+        :param packet: the packet
+        :return:
+        """
+        BYTES_SENT.inc(amount=FRAME_HEADER.size + len(packet))
+        client_socket.send(packet)
+
+    def login(self, client_socket, client_address, room, player_name, created):
+        """
+        Add the player who sent a LOGIN packet to the room, a command of the room
+        :param client_socket: client socket
+        :param client_address: the address of the client
+        :param room: the room
+        :param player_name: the name of the player
+        :param created: whether the room was just created for this player
+        :return: False if the connection to the client should be closed, True otherwise, None if the room has been closed
+        """
+        if room.closed:
+            return None
+        if not created:  # If the room already exists
+            if room.is_full():  # If the room is full, the number of players is greater than or equal to 4
+                # Respond to the message that the room is full and return to the client
+                packet = encode_login_response(PacketType.ROOM_ALREADY_FULL.value)
+                self.reply(client_socket, packet)
+                client_socket.close()
+                return False
+            if room.started:  # If the game in the room has started
+                packet = encode_login_response(PacketType.LOGIN_FAILED_GAME_STARTED.value)
+                self.reply(client_socket, packet)
+                client_socket.close()
+                return False
+            if room.player_exists(player_name):  # If a player with the same name already exists in the room
+                packet = encode_login_response(PacketType.LOGIN_FAILED_NAME_ALREADY_EXISTS.value)
+                self.reply(client_socket, packet)
+                return False
+            else:
+                # Create a Player object and add it to the room
+                player = Player(player_name, room.name, client_socket, client_address, False, COMPACT_HANDS)
+                room.add_player(player)
+                self.clients[client_address] = player
+                packet = encode_login_response(PacketType.LOGIN_SUCCESS.value, False)  # Non-administrator, common user
+                self.reply(client_socket, packet)  # Send a response indicating successful login
+                # Package all the usernames in the room and send them to the client who just logged in
+                packet = encode_player_list([p.name for p in room.players])
+                self.reply(client_socket, packet)
+        else:
+            # The room was created for this player, who becomes its administrator
+            player = Player(player_name, room.name, client_socket, client_address, True, COMPACT_HANDS)
+            room.add_player(player)
+            self.clients[client_address] = player
+            logger.info('room created', extra={'room': room.name, 'player': player_name, 'client': str(client_address)})
+            packet = encode_login_response(PacketType.LOGIN_SUCCESS.value, True)  # administrator
+            self.reply(client_socket, packet)
+        return True
+
+    def start_game(self, room):
+        """
+        Start the game of a room, a command of the room
+        :param room: the room
+        :return:
+        """
+        if self.bot_policy is not None:
+            room.add_bots(self.bot_policy)
+        room.start_game()
+
+    def handle_client(self, client_socket: FramedSocket, client_address):
         """
         Continuously receive client data and respond accordingly
         :param client_socket: client socket
-        :param client_address: not used here
+        :param client_address: the address of the client
         :return:
         """
         while True:
             packet = None
             try:
-                packet = client_socket.recv(1024)
-            except ConnectionResetError:
-                # If the client disconnects, remove the corresponding player from the room
-                for room_name in self.rooms.keys():
-                    for i in range(len(self.rooms[room_name].players)):
-                        if self.rooms[room_name].players[i].client_address == client_address:
-                            self.rooms[room_name].remove_player(i)
-                            break
+                packet = client_socket.recv_packet()
+            except OSError:
+                break
+            except FrameTooLarge:
+                logger.warning('packet too large, connection dropped', extra={'client': str(client_address)})
                 break
             if len(packet) == 0:  # 对方关闭连接
                 break
-            # Extract the type of packet, the length of the room name, and the length of the username from the packet
-            packet_type, len_room_name, len_player_name = struct.unpack('>III', packet[:12])
-            # Continue to extract the room name and player name from the packet
-            room_name = struct.unpack(f'{len_room_name}s', packet[12:12 + len_room_name])[0].decode('ASCII')
-            player_name = struct.unpack(f'{len_player_name}s', packet[12 + len_room_name:12 + len_room_name + len_player_name])[0].decode('ASCII')
-            # Calculate offset
-            offset = 12 + len_room_name + len_player_name
-            info = f'[SERVER] received client packet: packet type={packet_type} room is:{room_name} player name is:{player_name}'
-            logging.info(info)
-            print(info)
-
-            if packet_type == PacketType.LOGIN.value:  # Client login request, that is, enter the room request
-                if self.room_exists(room_name):  # If the room already exists
-                    if self.rooms[room_name].is_full():  # If the room is full, the number of players is greater than or equal to 4
-                        # Respond to the message that the room is full and return to the client
-                        packet = struct.pack('>Ic', PacketType.ROOM_ALREADY_FULL.value, b'N')
-                        client_socket.send(packet)
-                        client_socket.close()
-                        break
-                    if self.rooms[room_name].started:  # If the game in the room has started
-                        packet = struct.pack('>Ic', PacketType.LOGIN_FAILED_GAME_STARTED.value, b'N')
-                        client_socket.send(packet)
-                        client_socket.close()
-                        break
-                    if self.rooms[room_name].player_exists(player_name):  # If a player with the same name already exists in the room
-                        packet = struct.pack('>Ic', PacketType.LOGIN_FAILED_NAME_ALREADY_EXISTS.value, b'N')
-                        client_socket.send(packet)
-                        break
-                    else:
-                        # Create a Player object and add it to the room
-                        player = Player(player_name, room_name, client_socket, client_address, False)
-                        self.rooms[room_name].add_player(player)
-                        packet = struct.pack('>Ic', PacketType.LOGIN_SUCCESS.value, b'N')  # N: Non-administrator, common user
-                        client_socket.send(packet)  # Send a response indicating successful login
-                        # Package all the usernames in the room and send them to the client who just logged in
-                        names_str = ''
-                        for player in self.rooms[room_name].players:
-                            names_str += player.name + ';'
-                        names_str = names_str[:-1]
-                        packet = struct.pack(f'>II{len(names_str)}s', PacketType.PLAYER_LIST.value, len(names_str), names_str.encode('ASCII'))
-                        client_socket.send(packet)
-                else:
-                    # A room doesn't exist. Create a room
-                    self.rooms[room_name] = Room(room_name)
-                    player = Player(player_name, room_name, client_socket, client_address, True)
-                    self.rooms[room_name].add_player(player)
-                    packet = struct.pack('>Ic', PacketType.LOGIN_SUCCESS.value, b'A')  # A administrator
-                    client_socket.send(packet)
-            # Start the game
-            elif packet_type == PacketType.START_GAME.value:
-                self.rooms[room_name].reset_game(True)
-                self.rooms[room_name].shuffling_cards()
-            # The player plays a card.
-            elif packet_type == PacketType.PLAY_CARD.value:
-                # Extract the id and color of the cards played from the packet
-                card_id, card_color = struct.unpack('>II', packet[offset:offset + 8])
-                self.rooms[room_name].play_card(player_name, card_id, card_color)
-            # The player draws a card from the deck
-            elif packet_type == PacketType.DRAW_CARD.value:
-                self.rooms[room_name].draw_card(player_name)
-            # The player calls uno
-            elif packet_type == PacketType.CALL_UNO.value:
-                self.rooms[room_name].call_uno(packet)
+            if not self.dispatch_packet(client_socket, client_address, packet):
+                break
+        # If the client disconnects, remove the corresponding player from the room
+        self.remove_client(client_address)
+        client_socket.close()
 
     def start(self):
         print('server started')
-        self.server_socket.listen(1)  # Start listening
+        logger.info('server started')
+        self.server_socket.listen(LISTEN_BACKLOG)  # Start listening
+        self.start_sweeper()
 
         while True:
             client_socket, client_address = self.server_socket.accept()  # Client connection received
-            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, True)  # Keep the client connected continuously
-            # Create a child thread that receives data from the client
-            client_thread = threading.Thread(target=self.handle_client, args=(client_socket, client_address), daemon=True)
-            client_thread.start()
+            self.accept_client(client_socket, client_address)
+
+    def accept_client(self, client_socket, client_address, received=b''):
+        """
+        Start serving a new connection
+        :param client_socket: the connected socket
+        :param client_address: the address of the client
+        :param received: bytes that were already read from the connection
+        :return:
+        """
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, True)  # Keep the client connected continuously
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+        client_socket = FramedSocket(client_socket, queued=True)  # Send and receive whole packets, and queue outgoing packets
+        client_socket.reader.feed(received)
+        # Create a child thread that receives data from the client
+        client_thread = threading.Thread(target=self.handle_client, args=(client_socket, client_address), daemon=True)
+        client_thread.start()
+
+
+class StreamSocket:
+    """
+    Wraps an asyncio StreamWriter so that Room and Server can use it like a socket
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+
+    def send(self, packet):
+        """
+        Queue one packet on the transport. The event loop writes it out without blocking the caller.
+        A client that doesn't read its packets is cut off once its write buffer holds more than OUTBOUND_BUFFER_LIMIT bytes.
+        :param packet: the packet to send
+        :return: the length of the packet, 0 if the packet was dropped
+        """
+        transport = self.writer.transport
+        if transport.is_closing():
+            return 0
+        if transport.get_write_buffer_size() >= OUTBOUND_BUFFER_LIMIT:
+            # Throw the buffered packets away and close the connection now, like FramedSocket.abort
+            transport.abort()
+            return 0
+        self.writer.write(frame_packet(packet))
+        return len(packet)
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncServer(Server):
+    """
+    Server that handles every client on a single asyncio event loop instead of one thread per client
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loop = None  # type:asyncio.AbstractEventLoop # The event loop, once the server is serving
+        self.sweeper = None  # type:asyncio.Task
+
+    def create_executor(self):
+        # Every room lives on the event loop thread, so the rooms run their commands right away
+        return None
+
+    def run_in_room(self, room, function):
+        if self.loop is None:  # Not serving yet
+            return super().run_in_room(room, function)
+        # The commands of the rooms must run on the event loop thread
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(function())
+            except Exception as e:
+                future.set_exception(e)
+
+        self.loop.call_soon_threadsafe(run)
+        return future
+
+    async def handle_stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Continuously receive client data and respond accordingly, the asyncio version of handle_client
+        :param reader: stream to read the client data from
+        :param writer: stream to write the responses to
+        :return:
+        """
+        client_socket = StreamSocket(writer)
+        client_address = writer.get_extra_info('peername')
+        sock = writer.get_extra_info('socket')
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, True)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+        frame_reader = FrameReader()
+        while True:
+            try:
+                data = await reader.read(RECV_BUFFER_SIZE)
+            except OSError:
+                break
+            if len(data) == 0:
+                break
+            frame_reader.feed(data)
+            # One read may contain several packets, or only part of one
+            keep_open = True
+            try:
+                packet = frame_reader.next_packet()
+                while packet is not None and keep_open:
+                    keep_open = self.dispatch_packet(client_socket, client_address, packet)
+                    packet = frame_reader.next_packet()
+            except FrameTooLarge:
+                logger.warning('packet too large, connection dropped', extra={'client': str(client_address)})
+                keep_open = False
+            if not keep_open:
+                break
+            try:
+                await writer.drain()  # Wait here if this client is reading more slowly than we are writing
+            except OSError:
+                break
+        # If the client disconnects, remove the corresponding player from the room
+        self.remove_client(client_address)
+        writer.close()
+
+    async def run_sweeper(self):
+        # The rooms live on the event loop thread, so the sweeper runs there too
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            self.sweep_rooms()
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(self.handle_stream, sock=self.server_socket, backlog=LISTEN_BACKLOG)
+        print('server started (asyncio)')
+        logger.info('server started (asyncio)')
+        self.sweeper = asyncio.create_task(self.run_sweeper())  # Keep a reference, or the task could be garbage collected
+        async with server:
+            await server.serve_forever()
+
+    def start(self):
+        asyncio.run(self.serve())
 
 
 if __name__ == '__main__':
-    # Log setting
-    logging.basicConfig(
-        filename='logging.txt',
-        level=logging.INFO,
-        format='',
-        filemode='w'
-    )
+    parser = argparse.ArgumentParser(description='Uno game server')
+    parser.add_argument('--mode', choices=['thread', 'asyncio', 'shard'], default='thread',
+                        help='one thread per client, one asyncio event loop for all clients, or the rooms spread over worker processes')
+    parser.add_argument('--shards', type=int, help='the number of worker processes in shard mode, one per core by default')
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--log-file', default=LOG_FILE)
+    parser.add_argument('--log-sample', type=float, default=PACKET_LOG_SAMPLE_RATE, help='fraction of the received packets to log, more than 0 and at most 1')
+    parser.add_argument('--log-max-bytes', type=int, default=LOG_MAX_BYTES, help='rotate the log file when it gets bigger than this')
+    parser.add_argument('--log-backups', type=int, default=LOG_BACKUP_COUNT, help='number of rotated log files to keep')
+    parser.add_argument('--log-rotate-seconds', type=int, default=0, help='also rotate the log file every this many seconds')
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT, help='serve the metrics at http://127.0.0.1:port/metrics, 0 to turn off')
+    parser.add_argument('--bots', choices=sorted(POLICIES), help='fill the empty seats of a room with bots of this policy when the game starts')
+    args = parser.parse_args()
+    if not 0 < args.log_sample <= 1:
+        parser.error('--log-sample must be more than 0 and at most 1')
+    # Log setting: the records go through a queue to a listener thread that writes them to a rotating file
+    setup_logging(args.log_file, logging.INFO, args.log_max_bytes, args.log_backups, args.log_rotate_seconds)
+    if args.mode == 'shard':
+        # The router logs to the log file, each worker process has its own log file and metrics port
+        from shardServer import ShardRouter
+        settings = {'log_file': args.log_file, 'log_max_bytes': args.log_max_bytes, 'log_backup_count': args.log_backups,
+                    'log_rotate_seconds': args.log_rotate_seconds, 'packet_log_rate': args.log_sample, 'bot_policy': args.bots,
+                    'metrics_port': args.metrics_port}
+        ShardRouter(SERVER_ADDRESS, args.port, args.shards, settings).start()
     # Construct a Server object and start it
-    server = Server()
+    if args.mode == 'asyncio':
+        server = AsyncServer(SERVER_ADDRESS, args.port, args.bots, args.log_sample)
+    else:
+        server = Server(SERVER_ADDRESS, args.port, args.bots, args.log_sample)
+    if args.metrics_port != 0:
+        server.register_metrics()
+        start_metrics_server(port=args.metrics_port)
     server.start()
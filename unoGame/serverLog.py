@@ -0,0 +1,117 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import time
+
+LOG_FILE = 'logging.txt'
+LOG_MAX_BYTES = 10 * 1024 * 1024  # The log file is rotated when it gets bigger than this
+LOG_BACKUP_COUNT = 5  # The number of rotated log files that are kept
+PACKET_LOG_SAMPLE_RATE = 0.01  # The fraction of the received packets that are logged
+# Fields that can be passed in the "extra" argument of a logging call and are written to the structured record
+STRUCTURED_FIELDS = ('room', 'player', 'packet_type', 'latency_ms', 'client')
+
+logger = logging.getLogger('uno.server')
+packet_logger = logging.getLogger('uno.server.packets')
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line, so that the log can be searched and aggregated by room, player, etc.
+    """
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data)
+
+    def formatTime(self, record, datefmt=None):
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}'
+
+
+class RotatingLogHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotates the log file when it gets bigger than max_bytes, and also every "interval" seconds if an interval is given.
+    The rotated files are named logging.txt.1, logging.txt.2, ... with logging.txt.1 the most recent.
+    """
+
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, interval=0):
+        """
+        :param filename: the log file
+        :param max_bytes: rotate when the file is bigger than this, 0 for never
+        :param backup_count: the number of rotated files to keep
+        :param interval: rotate every interval seconds, 0 for never
+        """
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self.interval = interval
+        self.rollover_at = time.time() + interval
+
+    def shouldRollover(self, record):
+        if self.interval > 0 and record.created >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+class PacketSampler:
+    """
+    Decides which packets are logged. Every n-th packet is logged, so the decision costs one addition.
+    """
+
+    def __init__(self, rate=PACKET_LOG_SAMPLE_RATE):
+        """
+        :param rate: the fraction of the packets to log, more than 0 and at most 1 (all)
+        """
+        if not 0 < rate <= 1:
+            raise ValueError(f'packet log rate must be more than 0 and at most 1, not {rate}')
+        self.every = max(1, round(1 / rate))
+        self.count = 0
+
+    def sample(self):
+        """
+        :return: True if this packet should be logged
+        """
+        self.count += 1
+        if self.count >= self.every:
+            self.count = 0
+            return True
+        return False
+
+
+def setup_logging(filename=LOG_FILE, level=logging.INFO, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, interval=0):
+    """
+    Send the log records of the server to a queue. A listener thread takes them from the queue, formats them and
+    writes them to a rotating file, so the threads that handle the clients never wait for the disk.
+    :param filename: the log file
+    :param level: the lowest level that is logged
+    :param max_bytes: rotate the file when it gets bigger than this
+    :param backup_count: the number of rotated files to keep
+    :param interval: also rotate the file every interval seconds, 0 for never
+    :return: the started QueueListener, it is stopped when the program exits
+    """
+    log_queue = queue.SimpleQueue()
+    file_handler = RotatingLogHandler(filename, max_bytes, backup_count, interval)
+    file_handler.setFormatter(StructuredFormatter())
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)  # Write out the records that are still in the queue
+    return listener
@@ -0,0 +1,210 @@
+import logging
+import multiprocessing
+import os
+import selectors
+import socket
+import struct
+import time
+import zlib
+
+from codec import decode_client_header
+from framing import FRAME_HEADER
+from metrics import start_metrics_server
+from protocal import PacketType
+from server import Server, LISTEN_BACKLOG
+from serverLog import logger, setup_logging, PACKET_LOG_SAMPLE_RATE, LOG_MAX_BYTES, LOG_BACKUP_COUNT
+
+LOGIN_TIMEOUT = 10  # A connection that hasn't sent its LOGIN packet after this many seconds is closed
+MAX_LOGIN_SIZE = 4096  # A first packet bigger than this is not a LOGIN packet
+HANDOFF_BUFFER_SIZE = 65536  # Size of the messages on the channel between the router and a worker
+HANDOFF_TIMEOUT = 0.5  # The longest the router waits for a worker to take a connection, so a stuck worker can't stop it
+
+
+def get_shard(room_name, shards_num):
+    """
+    The worker that owns a room. A room always goes to the same worker, so all its players meet there.
+    :param room_name: name of the room
+    :param shards_num: the number of workers
+    :return: the index of the worker
+    """
+    return zlib.crc32(room_name.encode('ASCII')) % shards_num
+
+
+class ShardWorker(Server):
+    """
+    A server in a worker process. It doesn't listen: the router hands it the connections of the rooms it owns,
+    together with the bytes the router already read from them.
+    """
+
+    def __init__(self, channel: socket.socket, bot_policy=None, packet_log_rate=PACKET_LOG_SAMPLE_RATE):
+        """
+        :param channel: the worker's end of the channel to the router
+        :param bot_policy: see Server
+        :param packet_log_rate: see Server
+        """
+        super().__init__(None, None, bot_policy, packet_log_rate)
+        self.channel = channel
+
+    def start(self):
+        self.start_sweeper()
+        while True:
+            data, fds, _, _ = socket.recv_fds(self.channel, HANDOFF_BUFFER_SIZE, 1)
+            if not data:  # The router has stopped
+                break
+            for fd in fds:
+                client_socket = socket.socket(fileno=fd)
+                client_socket.setblocking(True)  # The router read from it without blocking
+                try:
+                    client_address = client_socket.getpeername()
+                except OSError:
+                    # The client has gone already
+                    client_socket.close()
+                    continue
+                self.accept_client(client_socket, client_address, data[1:])
+
+
+def run_worker(shard, channel, settings):
+    """
+    The function of a worker process
+    :param shard: the index of the worker
+    :param channel: the worker's end of the channel to the router
+    :param settings: see ShardRouter
+    :return:
+    """
+    setup_logging(f'{settings["log_file"]}.shard{shard}', logging.INFO, settings.get('log_max_bytes', LOG_MAX_BYTES),
+                  settings.get('log_backup_count', LOG_BACKUP_COUNT), settings.get('log_rotate_seconds', 0))
+    worker = ShardWorker(channel, settings.get('bot_policy'), settings.get('packet_log_rate', PACKET_LOG_SAMPLE_RATE))
+    if settings.get('metrics_port'):
+        worker.register_metrics()
+        start_metrics_server(port=settings['metrics_port'] + shard)
+    logger.info(f'shard {shard} started, pid {os.getpid()}')
+    worker.start()
+
+
+class ShardRouter:
+    """
+    Accepts the connections and routes each one to the worker process that owns its room, so that the game logic of
+    different rooms runs on different cores. The router reads the first packet of a connection, which is the LOGIN
+    packet with the room name, and then passes the socket itself to the worker with SCM_RIGHTS, together with the bytes
+    read so far. From then on the client talks to the worker directly.
+    """
+
+    def __init__(self, address, port, shards_num=None, settings=None):
+        """
+        :param address: the ip address the server listens on
+        :param port: the port the server listens on
+        :param shards_num: the number of worker processes, one per core by default
+        :param settings: a dictionary for the workers: log_file, log_max_bytes, log_backup_count, log_rotate_seconds,
+                         packet_log_rate, bot_policy, metrics_port (worker i serves its metrics on metrics_port + i)
+        """
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((address, port))
+        self.shards_num = shards_num or os.cpu_count()
+        self.settings = settings or {'log_file': 'logging.txt'}
+        self.channels = [None] * self.shards_num  # type:list[socket.socket] # The router's end of the channel to each worker
+        self.workers = [None] * self.shards_num  # type:list[multiprocessing.process.BaseProcess]
+        self.pending = {}  # type:dict[socket.socket,list] # Connections whose LOGIN packet hasn't arrived: [received bytes, accept time]
+        self.selector = selectors.DefaultSelector()
+
+    def start_workers(self):
+        for shard in range(self.shards_num):
+            self.start_worker(shard)
+
+    def start_worker(self, shard):
+        """
+        Start the worker process of a shard, or a new one in place of a worker that has died
+        :param shard: the index of the worker
+        :return:
+        """
+        if self.channels[shard] is not None:
+            self.channels[shard].close()
+        # A spawned worker only gets its own end of its channel. A forked one would also inherit the router's ends
+        # of the channels and the listening socket, and would never notice that the router has stopped.
+        context = multiprocessing.get_context('spawn')
+        router_end, worker_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        router_end.settimeout(HANDOFF_TIMEOUT)
+        worker = context.Process(target=run_worker, args=(shard, worker_end, self.settings), daemon=True)
+        worker.start()
+        worker_end.close()
+        self.channels[shard] = router_end
+        self.workers[shard] = worker
+
+    def start(self):
+        self.start_workers()
+        self.server_socket.listen(LISTEN_BACKLOG)
+        self.server_socket.setblocking(False)
+        self.selector.register(self.server_socket, selectors.EVENT_READ)
+        print(f'server started ({self.shards_num} shards)')
+        while True:
+            for key, _ in self.selector.select(timeout=1):
+                if key.fileobj is self.server_socket:
+                    self.accept()
+                else:
+                    self.read_login(key.fileobj)
+            self.close_idle_connections()
+
+    def accept(self):
+        try:
+            client_socket, _ = self.server_socket.accept()
+        except BlockingIOError:
+            return
+        client_socket.setblocking(False)
+        self.pending[client_socket] = [bytearray(), time.monotonic()]
+        self.selector.register(client_socket, selectors.EVENT_READ)
+
+    def read_login(self, client_socket):
+        """
+        Read from a connection until its first packet is complete, then hand the connection over to its worker
+        :param client_socket: a connection that hasn't been handed over yet
+        :return:
+        """
+        received = self.pending[client_socket][0]
+        try:
+            data = client_socket.recv(MAX_LOGIN_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self.drop(client_socket)
+            return
+        received += data
+        if len(received) < FRAME_HEADER.size:
+            return
+        length = FRAME_HEADER.unpack_from(received)[0]
+        if length > MAX_LOGIN_SIZE:
+            self.drop(client_socket)
+            return
+        if len(received) < FRAME_HEADER.size + length:
+            return
+        try:
+            packet_type, room_name, _, _ = decode_client_header(received[FRAME_HEADER.size:FRAME_HEADER.size + length])
+        except (struct.error, UnicodeDecodeError):
+            packet_type = None
+        if packet_type != PacketType.LOGIN.value:
+            self.drop(client_socket)
+            return
+        shard = get_shard(room_name, self.shards_num)
+        try:
+            # The first byte makes sure the message is never empty, an empty message means the router has stopped
+            socket.send_fds(self.channels[shard], [b'L' + bytes(received)], [client_socket.fileno()])
+        except OSError:
+            # The worker is dead, or too busy to take the connection in time. The client can log in again.
+            logger.exception(f'shard {shard} did not take a connection', extra={'room': room_name})
+            worker = self.workers[shard]
+            if worker is not None and not worker.is_alive():
+                logger.error(f'shard {shard} died with exit code {worker.exitcode}, starting a new one')
+                self.start_worker(shard)
+        self.drop(client_socket)  # The worker has its own descriptor of the connection now, or it has been refused
+
+    def drop(self, client_socket):
+        self.selector.unregister(client_socket)
+        del self.pending[client_socket]
+        client_socket.close()
+
+    def close_idle_connections(self):
+        now = time.monotonic()
+        for client_socket, (_, accepted) in list(self.pending.items()):
+            if now - accepted > LOGIN_TIMEOUT:
+                self.drop(client_socket)
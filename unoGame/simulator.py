@@ -0,0 +1,152 @@
+import argparse
+import multiprocessing
+import random
+import time
+
+from engine import GameEngine
+from player import Player
+from policy import POLICIES, get_policy
+
+MAX_MOVES = 100000  # A match that takes more moves than this is stopped and counted as unfinished
+SCORE_BUCKET = 50  # Width of the buckets of the final score histogram
+SHARD_SIZE = 20  # The number of matches a worker process plays with one seed
+
+
+def new_stats(players_num):
+    """
+    :param players_num: the number of players in a match
+    :return: empty statistics, which merge_stats adds up
+    """
+    return {
+        'matches': 0,
+        'unfinished': 0,
+        'wins': [0] * players_num,  # The number of matches won by the player in each seat
+        'moves': 0,
+        'rounds': 0,
+        'reshuffles': 0,
+        'moves_per_match': {},  # Histogram of the number of moves in a match, in buckets of 100 moves
+        'scores': {},  # Histogram of the final scores of all players, in buckets of SCORE_BUCKET points
+        'seconds': 0.0,  # Time spent playing, summed over all processes
+    }
+
+
+def merge_stats(total, stats):
+    """
+    Add stats to total
+    :return: total
+    """
+    for key in ['matches', 'unfinished', 'moves', 'rounds', 'reshuffles', 'seconds']:
+        total[key] += stats[key]
+    for i, wins in enumerate(stats['wins']):
+        total['wins'][i] += wins
+    for key in ['moves_per_match', 'scores']:
+        for bucket, count in stats[key].items():
+            total[key][bucket] = total[key].get(bucket, 0) + count
+    return total
+
+
+def play_match(policies, rng, max_moves=MAX_MOVES):
+    """
+    Play one match until a player has 500 points
+    :param policies: a policy for each seat
+    :param rng: the random.Random of the match
+    :param max_moves: stop the match after this many moves
+    :return: the engine at the end of the match, the number of moves
+    """
+    engine = GameEngine('simulation', rng=rng, emit_packets=False, record_events=False)
+    for seat in range(len(policies)):
+        engine.add_player(Player(f'player{seat}', engine.name, None, None, seat == 0, True))
+    engine.start_game()
+    moves = 0
+    while engine.final_winner is None and moves < max_moves:
+        player = engine.curr_player
+        move = policies[engine.curr_seat].choose_move(engine, player)
+        if move is None:
+            engine.draw_card(player.name)
+        else:
+            engine.play_card(player.name, move[0], move[1])
+        moves += 1
+    return engine, moves
+
+
+def run_shard(args):
+    """
+    Play a share of the matches in a worker process
+    :param args: (number of matches, policy names, seed of this share, max moves)
+    :return: statistics of the matches
+    """
+    matches, policy_names, seed, max_moves = args
+    rng = random.Random(seed)
+    policies = [get_policy(name, random.Random(rng.random())) for name in policy_names]
+    stats = new_stats(len(policy_names))
+    start = time.perf_counter()
+    for _ in range(matches):
+        engine, moves = play_match(policies, rng, max_moves)
+        stats['matches'] += 1
+        stats['moves'] += moves
+        stats['rounds'] += engine.round_count
+        stats['reshuffles'] += engine.reshuffle_count
+        bucket = moves // 100 * 100
+        stats['moves_per_match'][bucket] = stats['moves_per_match'].get(bucket, 0) + 1
+        if engine.final_winner is None:
+            stats['unfinished'] += 1
+            continue
+        stats['wins'][engine.seats[engine.final_winner.name]] += 1
+        for player in engine.players:
+            bucket = player.score // SCORE_BUCKET * SCORE_BUCKET
+            stats['scores'][bucket] = stats['scores'].get(bucket, 0) + 1
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def simulate(matches, policy_names=('random',) * 4, processes=None, seed=0, max_moves=MAX_MOVES):
+    """
+    Play many matches and collect statistics. The matches are split into shards that run in a pool of processes,
+    each shard has its own seed, so the result only depends on the seed, not on the number of processes.
+    :param matches: the number of matches
+    :param policy_names: the name of the policy of each seat, 2 to 4 seats
+    :param processes: the number of worker processes, all cores by default, 1 to play in this process
+    :param seed: random seed
+    :param max_moves: stop a match after this many moves
+    :return: the statistics, see new_stats
+    """
+    processes = processes or multiprocessing.cpu_count()
+    shards = [(min(SHARD_SIZE, matches - i), list(policy_names), seed * 100003 + i, max_moves) for i in range(0, matches, SHARD_SIZE)]
+    total = new_stats(len(policy_names))
+    start = time.perf_counter()
+    if processes == 1:
+        for stats in map(run_shard, shards):
+            merge_stats(total, stats)
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            for stats in pool.imap_unordered(run_shard, shards):
+                merge_stats(total, stats)
+    total['wall_seconds'] = time.perf_counter() - start
+    return total
+
+
+def print_report(stats, policy_names, processes):
+    matches = stats['matches']
+    finished = matches - stats['unfinished']
+    print(f'{matches} matches, {finished} finished, {stats["moves"]} moves in {stats["wall_seconds"]:.2f} s with {processes} processes')
+    print(f'moves per second: {stats["moves"] / stats["wall_seconds"]:.0f} in total, {stats["moves"] / stats["seconds"]:.0f} per core')
+    print(f'average per match: {stats["moves"] / matches:.1f} moves, {stats["rounds"] / matches:.2f} rounds, {stats["reshuffles"] / matches:.2f} reshuffles')
+    for seat, name in enumerate(policy_names):
+        print(f'seat {seat} ({name}): win rate {stats["wins"][seat] / max(finished, 1):.3f}')
+    print('moves per match:')
+    for bucket in sorted(stats['moves_per_match']):
+        print(f'  {bucket:>6}-{bucket + 99:<6}{stats["moves_per_match"][bucket]}')
+    print('final scores:')
+    for bucket in sorted(stats['scores']):
+        print(f'  {bucket:>6}-{bucket + SCORE_BUCKET - 1:<6}{stats["scores"][bucket]}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play whole Uno matches without clients and print statistics')
+    parser.add_argument('--matches', type=int, default=1000)
+    parser.add_argument('--policies', nargs='+', choices=sorted(POLICIES), default=['random'] * 4, help='the policy of each seat, 2 to 4 seats')
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    result = simulate(args.matches, args.policies, args.processes, args.seed)
+    print_report(result, args.policies, args.processes)
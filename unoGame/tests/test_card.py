@@ -0,0 +1,38 @@
+import unittest
+
+from card import *
+
+
+class TestCard(unittest.TestCase):
+    def test_can_play_same_as_rules(self):
+        for deck_card_id in CARD_IDS:
+            for color in [None, 0, 1, 2, 3, 4]:
+                mask = get_playable_mask(deck_card_id, color)
+                for card_id in CARD_IDS:
+                    expected = can_play_by_rules(deck_card_id, card_id, color)
+                    self.assertEqual(can_play(deck_card_id, card_id, color), expected, (deck_card_id, card_id, color))
+                    self.assertEqual(mask >> card_id & 1 == 1, expected)
+
+    def test_has_playable_card(self):
+        cards = get_card_catalogue()
+        for deck_card_id in CARD_IDS:
+            for color in [None, 1, 2, 3, 4]:
+                for i in range(0, len(cards), 5):
+                    hand = cards[i:i + 5]
+                    expected = any(can_play_by_rules(deck_card_id, card.id, color) for card in hand)
+                    self.assertEqual(has_playable_card(deck_card_id, hand, color), expected)
+
+    def test_card_attributes(self):
+        for card_id in CARD_IDS:
+            self.assertEqual(CARD_IS_WILD[card_id], is_wild_card(card_id))
+            if is_regular_card(card_id):
+                self.assertEqual((CARD_NUMBERS[card_id], CARD_POINTS[card_id]), (get_card_num(card_id), card_id % 10))
+            elif is_action_card(card_id):
+                self.assertEqual((CARD_ACTIONS[card_id], CARD_POINTS[card_id]), (get_card_action_by_id(card_id), 20))
+            else:
+                self.assertEqual(CARD_POINTS[card_id], 50)
+        self.assertEqual(len(get_card_catalogue()), 108)
+
+
+if __name__ == '__main__':
+    unittest.main()
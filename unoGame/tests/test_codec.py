@@ -0,0 +1,102 @@
+import gc
+import random
+import unittest
+
+from card import read_cards_from_csv
+from codec import *
+from player import Player
+from protocal import *
+from room import Room
+
+
+def make_room(hand_sizes, seed=0):
+    """
+    Build a room in the middle of a game without any client sockets
+    :param hand_sizes: the number of cards in the hand of each player
+    :param seed: random seed used to shuffle the cards
+    :return: the room
+    """
+    random.seed(seed)
+    room = Room('room1')
+    room.cards = read_cards_from_csv()
+    random.shuffle(room.cards)
+    for i, hand_size in enumerate(hand_sizes):
+        player = Player(f'player{i}', room.name, None, None, i == 0)
+        player.score = 10 * i
+        player.cards_in_hand = [room.cards.pop() for _ in range(hand_size)]
+        room.add_player(player)
+    room.curr_card = room.cards.pop()
+    room.curr_card_color = 2
+    room.curr_player = room.players[-1]
+    return room
+
+
+class TestCodec(unittest.TestCase):
+    def test_game_state_only_has_own_cards(self):
+        for hand_sizes in ([7, 7], [0, 3, 12, 1], [25, 25, 25, 25]):
+            room = make_room(hand_sizes)
+            for first in (True, False):
+                for seat, viewer in enumerate(room.players):
+                    result = decode_game_state(encode_game_state(room, first, viewer))
+                    # The public part is the same as the original full table
+                    expected = unpack_cards_info_client(get_game_state_packet_server(room, first))
+                    for player_info, expected_info in zip(result['players'], expected['players']):
+                        self.assertEqual(player_info['cards_num'], len(expected_info['cards']))
+                        if player_info['name'] == viewer.name:
+                            self.assertEqual(player_info['cards'], expected_info['cards'])
+                        else:
+                            self.assertIsNone(player_info['cards'])
+                        del player_info['cards_num'], player_info['cards'], expected_info['cards']
+                    self.assertEqual(result, expected)
+
+    def test_game_state_without_current_card(self):
+        room = make_room([3, 3])
+        room.curr_card = None
+        result = decode_game_state(encode_game_state(room))
+        self.assertIsNone(result['curr_card_id'])
+        self.assertEqual([player_info['cards'] for player_info in result['players']], [None, None])
+
+    def test_state_layout_is_kept_per_room(self):
+        room = make_room([3, 3])
+        layout = get_state_layout(room, True)
+        self.assertIs(get_state_layout(room, True), layout)
+        room.players[0].name = 'somebody else'
+        self.assertIsNot(get_state_layout(room, True), layout)
+        gc.collect()
+        rooms_num = len(STATE_LAYOUTS)
+        del room
+        gc.collect()
+        self.assertEqual(len(STATE_LAYOUTS), rooms_num - 1)
+
+    def test_state_delta(self):
+        room = make_room([5, 5, 5])
+        p0, p1, p2 = room.players
+        played_card = p0.cards_in_hand.pop()
+        draws = [(p1, room.cards[-1]), (p1, room.cards[-2]), (p2, room.cards[-3])]
+        room.clockwise = False
+        delta = decode_state_delta(encode_state_delta(room, p1, (p0, played_card), draws))
+        self.assertEqual(delta['cards_num'], len(room.cards))
+        self.assertEqual((delta['curr_card_id'], delta['curr_card_color']), (room.curr_card.id, 2))
+        self.assertFalse(delta['clockwise'])
+        self.assertEqual(delta['turn_seat'], 2)
+        self.assertEqual((delta['played_seat'], delta['played_card_id']), (0, played_card.id))
+        self.assertEqual(delta['draws'], [(1, 2, [room.cards[-1].id, room.cards[-2].id]), (2, 1, None)])
+        delta = decode_state_delta(encode_state_delta(room, p0, (p0, played_card), draws))
+        self.assertEqual(delta['draws'], [(1, 2, None), (2, 1, None)])
+        delta = decode_state_delta(encode_state_delta(room))
+        self.assertIsNone(delta['played_seat'])
+        self.assertEqual(delta['draws'], [])
+
+    def test_client_packets(self):
+        packet = encode_play_card('alice', 'room1', 42, 3)
+        self.assertEqual(packet, build_play_card_packet('alice', 'room1', 42, 3))
+        packet_type, room_name, player_name, offset = decode_client_header(packet)
+        self.assertEqual((packet_type, room_name, player_name), (PacketType.PLAY_CARD.value, 'room1', 'alice'))
+        self.assertEqual(decode_play_card_body(packet, offset), (42, 3))
+        self.assertEqual(decode_player_list(encode_player_list(['a', 'bb', 'ccc'])), ['a', 'bb', 'ccc'])
+        self.assertEqual(decode_game_over(encode_game_over(Player('winner'))), 'winner')
+        self.assertEqual(decode_login_response(encode_login_response(PacketType.LOGIN_SUCCESS.value, True)), (PacketType.LOGIN_SUCCESS.value, True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import random
+import unittest
+
+from card import can_play
+from codec import get_packet_type, decode_game_state
+from engine import GameEngine, GameEventType
+from player import Player
+from protocal import PacketType
+
+
+class TestEngine(unittest.TestCase):
+    def test_headless_game(self):
+        engine = GameEngine('room1', rng=random.Random(1))
+        for name in ['a', 'b', 'c']:
+            engine.add_player(Player(name, 'room1', None, None, name == 'a', True))
+        engine.take_output()
+        engine.start_game()
+        events, outbox = engine.take_output()
+        self.assertEqual([get_packet_type(message.packet) for message in outbox], [PacketType.START_GAME.value] * 3 + [PacketType.PLAYER_CARDS_INFO.value] * 3)
+        self.assertEqual(events[-1].event_type, GameEventType.ROUND_STARTED)
+        # Each player only sees his own cards
+        for message in outbox[3:]:
+            for player_info in decode_game_state(message.packet)['players']:
+                self.assertEqual(player_info['cards'] is not None, player_info['name'] == message.player.name)
+
+        # Play until a round is won, the deck never runs out of cards
+        for _ in range(1000):
+            player = engine.curr_player
+            cards = [card for card in player.cards_in_hand if engine.curr_card_color == 0 or can_play(engine.curr_card.id, card.id, engine.curr_card_color)]
+            if cards:
+                engine.play_card(player.name, cards[0].id, 1)
+            else:
+                engine.draw_card(player.name)
+            events, outbox = engine.take_output()
+            self.assertTrue(all(message.player in engine.players for message in outbox))
+            if any(event.event_type == GameEventType.ROUND_WON for event in events):
+                break
+        else:
+            self.fail('no round was won')
+        self.assertEqual(len(engine.cards) + len(engine.discard_pile) + sum(len(p.cards_in_hand) for p in engine.players), 108)
+
+    def test_no_packets(self):
+        engine = GameEngine('room1', emit_packets=False, record_events=False)
+        for name in ['a', 'b']:
+            engine.add_player(Player(name, 'room1', None, None, name == 'a'))
+        engine.start_game()
+        self.assertEqual(engine.take_output(), ([], []))
+        self.assertEqual(sum(len(p.cards_in_hand) for p in engine.players), 14 + (2 if engine.curr_card.id in [12, 32, 52, 72] else 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from event import Event, EventType, coalesce_events
+
+
+def make_events(*event_types):
+    return [Event(event_type) for event_type in event_types]
+
+
+class TestCoalesceEvents(unittest.TestCase):
+    def test_full_state_drops_earlier_states(self):
+        events = make_events(EventType.GAME_STATE, EventType.GAME_STATE_DELTA, EventType.GAME_STATE, EventType.GAME_STATE_DELTA)
+        result = coalesce_events(events)
+        self.assertEqual(result, events[2:])
+
+    def test_barriers_are_kept_in_order(self):
+        events = make_events(EventType.UPDATE_PLAYER_LIST, EventType.GAME_STATE, EventType.START_GAME, EventType.GAME_STATE_DELTA,
+                             EventType.CALL_UNO, EventType.GAME_STATE, EventType.GAME_STATE, EventType.FINAL_WIN)
+        result = coalesce_events(events)
+        # The states before START_GAME and CALL_UNO are kept, only the first of the last two states is dropped
+        self.assertEqual(result, events[:5] + events[6:])
+
+    def test_first_state_of_round_is_kept(self):
+        events = make_events(EventType.GAME_STATE, EventType.GAME_STATE_DELTA, EventType.GAME_STATE)
+        events[0].cards_info = {'first': True}
+        self.assertEqual(coalesce_events(events), [events[0], events[2]])
+
+    def test_deltas_alone_are_kept(self):
+        events = make_events(EventType.GAME_STATE_DELTA, EventType.GAME_STATE_DELTA)
+        self.assertEqual(coalesce_events(events), events)
+
+
+if __name__ == '__main__':
+    unittest.main()
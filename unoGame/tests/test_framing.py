@@ -0,0 +1,74 @@
+import socket
+import threading
+import unittest
+
+import struct
+
+from framing import FrameReader, FramedSocket, FrameTooLarge, frame_packet, MAX_PACKET_SIZE, OUTBOUND_QUEUE_LIMIT
+
+
+class TestFraming(unittest.TestCase):
+    def test_split_and_merged_packets(self):
+        packets = [bytes([i]) * i for i in range(50)]
+        stream = b''.join(frame_packet(packet) for packet in packets)
+        reader = FrameReader(16)
+        received = []
+        # Feed the stream in odd-sized pieces so that packets are both split and merged
+        for i in range(0, len(stream), 7):
+            reader.feed(stream[i:i + 7])
+            packet = reader.next_packet()
+            while packet is not None:
+                received.append(packet)
+                packet = reader.next_packet()
+        self.assertEqual(received, packets)
+
+    def test_oversized_length_is_rejected(self):
+        reader = FrameReader(16)
+        reader.feed(struct.pack('>I', 0x7fffffff) + b'x')
+        with self.assertRaises(FrameTooLarge):
+            reader.next_packet()
+        self.assertEqual(len(reader.buffer), 16)  # Nothing was allocated for it
+        reader = FrameReader(16)
+        reader.feed(frame_packet(b'y' * MAX_PACKET_SIZE))
+        self.assertEqual(len(reader.next_packet()), MAX_PACKET_SIZE)
+
+    def test_framed_socket(self):
+        a, b = socket.socketpair()
+        sender, receiver = FramedSocket(a), FramedSocket(b)
+        big = b'x' * MAX_PACKET_SIZE  # Bigger than the initial buffer once the header is added
+        sending = threading.Thread(target=lambda: [sender.send(b'first'), sender.send(big), sender.close()])
+        sending.start()
+        self.assertEqual(receiver.recv_packet(), b'first')
+        self.assertEqual(receiver.recv_packet(), big)
+        sending.join()
+        self.assertEqual(receiver.recv_packet(), b'')
+        receiver.close()
+
+    def test_queued_socket_sends_everything_before_closing(self):
+        a, b = socket.socketpair()
+        sender, receiver = FramedSocket(a, queued=True), FramedSocket(b)
+        for i in range(100):
+            sender.send(str(i).encode())
+        sender.close()
+        for i in range(100):
+            self.assertEqual(receiver.recv_packet(), str(i).encode())
+        self.assertEqual(receiver.recv_packet(), b'')
+        receiver.close()
+
+    def test_stalled_client_is_cut_off(self):
+        a, b = socket.socketpair()
+        sender = FramedSocket(a, queued=True)
+        packet = b'x' * 16384
+        # b never reads, so the sender thread blocks in sendall and the queue fills up
+        for _ in range(OUTBOUND_QUEUE_LIMIT * 4):
+            if sender.send(packet) == 0:
+                break
+        self.assertTrue(sender.closed)
+        sender.sender.join(timeout=5)
+        self.assertFalse(sender.sender.is_alive())
+        self.assertLessEqual(sender.outbound.qsize(), 1)
+        b.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
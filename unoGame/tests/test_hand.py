@@ -0,0 +1,46 @@
+import random
+import unittest
+
+from card import CARD_IDS, get_card_catalogue, has_playable_card
+from hand import Hand, remove_card_by_id, get_hand_score, hand_has_playable_card
+
+
+class TestHand(unittest.TestCase):
+    def test_same_as_list(self):
+        random.seed(0)
+        catalogue = get_card_catalogue()
+        hand = Hand()
+        cards = []
+        for _ in range(2000):
+            if cards and random.random() < 0.4:
+                card_id = random.choice(cards).id
+                self.assertEqual(remove_card_by_id(hand, card_id).id, card_id)
+                remove_card_by_id(cards, card_id)
+            else:
+                card = random.choice(catalogue)
+                hand.append(card)
+                cards.append(card)
+            self.assertEqual(len(hand), len(cards))
+            self.assertEqual(sorted(card.id for card in hand), [card.id for card in hand])
+            self.assertEqual(sorted(card.id for card in hand), sorted(card.id for card in cards))
+            self.assertEqual(get_hand_score(hand), get_hand_score(cards))
+            deck_card_id, color = random.choice(CARD_IDS), random.randint(1, 4)
+            self.assertEqual(hand_has_playable_card(deck_card_id, hand, color), has_playable_card(deck_card_id, cards, color))
+
+    def test_list_methods(self):
+        catalogue = get_card_catalogue()
+        hand = Hand(catalogue[:3])
+        hand += catalogue[3:5]
+        self.assertEqual(len(hand), 5)
+        self.assertIn(catalogue[4], hand)
+        self.assertEqual(hand.count(catalogue[4].id), [card.id for card in catalogue[:5]].count(catalogue[4].id))
+        self.assertIsNone(hand.remove_id(90))
+        hand.remove(catalogue[0])
+        self.assertNotIn(catalogue[0].id, hand)
+        self.assertRaises(ValueError, hand.remove, catalogue[0])
+        hand.clear()
+        self.assertEqual((len(hand), get_hand_score(hand), list(hand)), (0, 0, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
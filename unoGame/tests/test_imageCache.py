@@ -0,0 +1,20 @@
+import unittest
+
+import imageCache
+from imageCache import get_scaled_image
+
+
+class TestImageCache(unittest.TestCase):
+    def test_scaled_image_is_decoded_once(self):
+        image = get_scaled_image('images/N.png', (100, 150))
+        self.assertEqual(image.size, (100, 150))
+        self.assertIs(get_scaled_image('images/N.png', (100, 150)), image)
+        # Other sizes and rotations reuse the decoded image
+        decoded = imageCache.decoded_images['images/N.png']
+        self.assertEqual(get_scaled_image('images/N.png', (100, 150), 90).size, (150, 100))
+        self.assertEqual(get_scaled_image('images/N.png', (120, 180)).size, (120, 180))
+        self.assertIs(imageCache.decoded_images['images/N.png'], decoded)
+
+
+if __name__ == '__main__':
+    unittest.main()
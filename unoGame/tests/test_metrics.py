@@ -0,0 +1,28 @@
+import unittest
+
+from metrics import Counter, Histogram, Registry
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render(self):
+        registry = Registry()
+        counter = registry.register(Counter('packets_total', 'Packets', ('type',)))
+        histogram = registry.register(Histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0)))
+        counter.inc('PLAY_CARD')
+        counter.inc('PLAY_CARD', amount=2)
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE packets_total counter', lines)
+        self.assertIn('packets_total{type="PLAY_CARD"} 3', lines)
+        # The buckets are cumulative
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 2', lines)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn('latency_seconds_sum 5.55', lines)
+        self.assertIn('latency_seconds_count 3', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
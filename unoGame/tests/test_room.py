@@ -1,14 +1,82 @@
+import random
 import unittest
+from unittest import mock
 
+from bot import BotPlayer
+from policy import RandomPolicy
 from room import Room
+from player import Player
 from constant import *
 
 
 class TestRoom(unittest.TestCase):
     def test_1(self):
         room = Room('room1')
-        room.reset_cards()
-        self.assertTrue(len(room.cards) == 108)
+        for name in ['a', 'b']:
+            room.add_player(Player(name, 'room1', None, None, name == 'a'))
+        room.start_game()
+        # Every card is in the deck, in a hand or on the discard pile
+        self.assertTrue(len(room.cards) + len(room.discard_pile) + sum(len(p.cards_in_hand) for p in room.players) == 108)
+
+    def test_remove_player_keeps_turn(self):
+        room = Room('room1')
+        for name in ['a', 'b', 'c', 'd']:
+            room.add_player(Player(name, 'room1', None, None, name == 'a'))
+        room.curr_player = room.players[2]
+        room.remove_player(0)
+        self.assertEqual(room.curr_player.name, 'c')
+        self.assertEqual(room.seats, {'b': 0, 'c': 1, 'd': 2})
+        self.assertIsNone(room.get_admin_player())
+        # When the current player leaves, it's the turn of the next player
+        room.remove_player(1)
+        self.assertEqual(room.curr_player.name, 'd')
+        room.clockwise = False
+        room.remove_player(1)
+        self.assertEqual(room.curr_player.name, 'b')
+        self.assertFalse(room.player_exists('d'))
+
+    def test_bots_fill_room(self):
+        class FakeSocket:
+            def __init__(self):
+                self.packets = []
+
+            def send(self, packet):
+                self.packets.append(packet)
+
+        room = Room('room1')
+        client_socket = FakeSocket()
+        human = Player('a', 'room1', client_socket, None, True, True)
+        room.add_player(human)
+        room.add_bots('color_counting')
+        self.assertEqual([p.name for p in room.players], ['a', 'bot1', 'bot2', 'bot3'])
+        self.assertTrue(all(isinstance(p, BotPlayer) for p in room.players[1:]))
+        room.start_game()
+        # The bots play right away, so whenever a command returns it's the person's turn, or the game is over
+        policy = RandomPolicy(random.Random(1))
+        for _ in range(10000):
+            if room.final_winner is not None:
+                break
+            self.assertIs(room.curr_player, human)
+            move = policy.choose_move(room, human)
+            if move is None:
+                room.draw_card(human.name)
+            else:
+                room.play_card(human.name, move[0], move[1])
+        self.assertIsNotNone(room.final_winner)
+        self.assertGreater(len(client_socket.packets), 0)
+        self.assertEqual(len(room.cards) + len(room.discard_pile) + sum(len(p.cards_in_hand) for p in room.players), 108)
+
+    def test_failed_bot_move_does_not_stop_the_bots(self):
+        room = Room('room1')
+        room.add_player(Player('a', 'room1', None, None, True, True))
+        room.add_bots('random')
+        room.closed = True
+        room.started = True
+        room.curr_player = room.players[1]
+        with mock.patch.object(BotPlayer, 'play_turn', side_effect=ValueError):
+            self.assertRaises(ValueError, room.run_bots)
+        self.assertFalse(room.running_bots)
+        self.assertTrue(room.closed)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,52 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from roomActor import RoomActor
+
+
+class TestRoomActor(unittest.TestCase):
+    def test_commands_run_in_order_one_at_a_time(self):
+        executor = ThreadPoolExecutor(4)
+        actors = [RoomActor(executor) for _ in range(3)]
+        logs = [[] for _ in actors]
+        running = [0] * len(actors)
+        overlaps = []
+
+        def command(room, sender, i):
+            running[room] += 1
+            if running[room] > 1:
+                overlaps.append(room)
+            logs[room].append((sender, i))
+            running[room] -= 1
+
+        def send(sender):
+            for i in range(500):
+                for room, actor in enumerate(actors):
+                    actor.submit(command, room, sender, i)
+
+        senders = [threading.Thread(target=send, args=(sender,)) for sender in range(4)]
+        for sender in senders:
+            sender.start()
+        for sender in senders:
+            sender.join()
+        # A command submitted after all the others finishes last
+        for actor in actors:
+            actor.submit(lambda: None).result(timeout=10)
+        executor.shutdown()
+        self.assertEqual(overlaps, [])
+        for log in logs:
+            self.assertEqual(len(log), 2000)
+            # The commands of each sender run in the order they were sent
+            for sender in range(4):
+                self.assertEqual([i for s, i in log if s == sender], list(range(500)))
+
+    def test_failed_command(self):
+        actor = RoomActor()
+        future = actor.submit(lambda: 1 / 0)
+        self.assertIsInstance(future.exception(), ZeroDivisionError)
+        self.assertEqual(actor.submit(lambda: 2).result(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
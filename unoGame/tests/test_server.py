@@ -0,0 +1,176 @@
+import socket
+import struct
+import threading
+import unittest
+from unittest import mock
+
+from codec import encode_client_header
+from protocal import PacketType
+from framing import FramedSocket, OUTBOUND_BUFFER_LIMIT
+from metrics import REGISTRY, REPORTS, PACKETS_RECEIVED, Registry
+from server import Server, StreamSocket
+
+
+class FakeSocket:
+    def __init__(self):
+        self.packets = []
+        self.closed = False
+
+    def send(self, packet):
+        self.packets.append(packet)
+
+    def close(self):
+        self.closed = True
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.server = Server('127.0.0.1', 0)
+
+    def tearDown(self):
+        self.server.server_socket.close()
+        self.server.executor.shutdown()
+
+    def login(self, player_name, room_name, client_address):
+        client_socket = FakeSocket()
+        packet = encode_client_header(PacketType.LOGIN.value, player_name, room_name)
+        self.assertTrue(self.server.dispatch_packet(client_socket, client_address, packet))
+        return client_socket
+
+    def wait_for_room(self, room):
+        # The commands of a room run in order, so when this one is done the ones before it are done too
+        room.actor.submit(lambda: None).result(timeout=10)
+
+    def test_room_closed_when_empty(self):
+        self.login('a', 'room1', 1)
+        self.login('b', 'room1', 2)
+        room = self.server.rooms['room1']
+        self.server.remove_client(1)
+        self.wait_for_room(room)
+        self.assertEqual([p.name for p in room.players], ['b'])
+        self.server.remove_client(2)
+        self.wait_for_room(room)
+        self.assertNotIn('room1', self.server.rooms)
+        self.assertTrue(room.closed)
+        self.assertEqual(room.players, [])
+        self.assertEqual(self.server.clients, {})
+        # The name can be used again for a new room
+        self.login('c', 'room1', 3)
+        self.assertIsNot(self.server.rooms['room1'], room)
+
+    def test_idle_room_expires(self):
+        client_socket = self.login('a', 'room1', 1)
+        room = self.server.rooms['room1']
+        self.assertEqual(self.server.sweep_rooms(), 0)
+        self.assertEqual(self.server.get_memory_report()['room1']['players'], 1)
+        self.server.room_ttl = 0
+        self.assertEqual(self.server.sweep_rooms(), 1)
+        self.wait_for_room(room)
+        self.assertEqual(self.server.rooms, {})
+        self.assertTrue(client_socket.closed)
+        self.assertEqual(self.server.get_memory_report(), {})
+
+    def test_malformed_packets_close_the_connection(self):
+        self.login('a', 'room1', 1)
+        # A header whose name lengths run past the end of the packet, and a PLAY_CARD packet without its body
+        self.assertFalse(self.server.dispatch_packet(FakeSocket(), 2, struct.pack('>III', PacketType.LOGIN.value, 100, 100)))
+        self.assertFalse(self.server.dispatch_packet(FakeSocket(), 3, b'\x00\x01'))
+        packet = encode_client_header(PacketType.PLAY_CARD.value, 'a', 'room1')
+        self.assertFalse(self.server.dispatch_packet(FakeSocket(), 1, packet))
+
+    def test_unknown_packet_types_share_one_label(self):
+        for packet_type in (1000, 1001):
+            self.assertTrue(self.server.dispatch_packet(FakeSocket(), 1, encode_client_header(packet_type, 'a', 'room1')))
+        self.assertEqual(PACKETS_RECEIVED.values[('UNKNOWN',)], 2)
+        self.assertNotIn(('1000',), PACKETS_RECEIVED.values)
+
+    def test_failed_login_closes_the_connection(self):
+        def fail(*args):
+            raise ValueError('bad login')
+
+        self.server.login = fail
+        client_socket = FakeSocket()
+        packet = encode_client_header(PacketType.LOGIN.value, 'a', 'room1')
+        self.assertFalse(self.server.dispatch_packet(client_socket, 1, packet))
+
+    def test_memory_report_runs_in_the_room(self):
+        self.login('a', 'room1', 1)
+        room = self.server.rooms['room1']
+        threads = []
+        footprint = room.get_memory_footprint
+        room.get_memory_footprint = lambda: threads.append(threading.current_thread()) or footprint()
+        self.assertEqual(self.server.get_memory_report()['room1']['players'], 1)
+        self.assertTrue(threads[0].name.startswith('room'))  # A worker of the rooms, not the calling thread
+        # A room that is busy for longer than the timeout is left out
+        started = threading.Event()
+        release = threading.Event()
+        room.actor.submit(lambda: started.set() or release.wait(10))
+        started.wait(5)
+        with mock.patch('server.REPORT_TIMEOUT', 0.05):
+            self.assertEqual(self.server.get_memory_report(), {})
+        release.set()
+
+    def test_metrics_are_registered_on_request(self):
+        # Building a server doesn't touch the metrics of the process
+        self.assertNotIn('uno_rooms', REGISTRY.metrics)
+        self.assertNotIn('/rooms', REPORTS)
+        registry, reports = Registry(), {}
+        self.server.register_metrics(registry, reports)
+        self.login('a', 'room1', 1)
+        self.assertIn('uno_rooms 1', registry.render())
+        self.assertEqual(reports['/rooms']()['room1']['players'], 1)
+
+    def test_memory_gauge_reuses_the_last_report(self):
+        self.login('a', 'room1', 1)
+        room = self.server.rooms['room1']
+        calls = []
+        footprint = room.get_memory_footprint
+        room.get_memory_footprint = lambda: calls.append(1) or footprint()
+        total = self.server.get_memory_bytes()
+        self.assertGreater(total, 0)
+        self.assertEqual(self.server.get_memory_bytes(), total)
+        self.assertEqual(len(calls), 1)
+        with mock.patch('server.MEMORY_GAUGE_INTERVAL', -1):
+            self.server.get_memory_bytes()
+        self.assertEqual(len(calls), 2)
+
+    def test_oversized_packet_drops_connection(self):
+        a, b = socket.socketpair()
+        b.sendall(struct.pack('>I', 0x7fffffff) + b'x')
+        self.server.handle_client(FramedSocket(a), 1)  # Returns instead of allocating 2 GiB
+        self.assertEqual(b.recv(1), b'')  # The server closed the connection
+        b.close()
+
+
+class TestStreamSocket(unittest.TestCase):
+    def test_stalled_client_is_cut_off(self):
+        class FakeTransport:
+            def __init__(self):
+                self.buffered = 0
+                self.aborted = False
+
+            def is_closing(self):
+                return self.aborted
+
+            def get_write_buffer_size(self):
+                return self.buffered
+
+            def abort(self):
+                self.aborted = True
+                self.buffered = 0
+
+        transport = FakeTransport()
+        writer = mock.Mock(transport=transport)
+        writer.write.side_effect = lambda data: setattr(transport, 'buffered', transport.buffered + len(data))
+        client_socket = StreamSocket(writer)
+        packet = b'x' * 1000
+        sent = 0
+        while client_socket.send(packet) != 0:
+            sent += 1
+        self.assertTrue(transport.aborted)
+        self.assertEqual(sent, -(-OUTBOUND_BUFFER_LIMIT // (len(packet) + 4)))
+        self.assertEqual(client_socket.send(packet), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import json
+import logging
+import unittest
+
+from serverLog import PacketSampler, StructuredFormatter
+
+
+class TestServerLog(unittest.TestCase):
+    def test_packet_sampler(self):
+        sampler = PacketSampler(0.1)
+        self.assertEqual(sum(sampler.sample() for _ in range(1000)), 100)
+        sampler = PacketSampler(1)
+        self.assertEqual(sum(sampler.sample() for _ in range(10)), 10)
+        sampler = PacketSampler(0.9)
+        self.assertEqual(sum(sampler.sample() for _ in range(10)), 10)
+        for rate in (0, -0.5, 1.5):
+            with self.assertRaises(ValueError):
+                PacketSampler(rate)
+
+    def test_structured_formatter(self):
+        record = logging.LogRecord('uno.server.packets', logging.INFO, __file__, 1, 'packet handled', None, None)
+        record.room = 'room1'
+        record.latency_ms = 0.5
+        data = json.loads(StructuredFormatter().format(record))
+        self.assertEqual(data['message'], 'packet handled')
+        self.assertEqual(data['room'], 'room1')
+        self.assertEqual(data['latency_ms'], 0.5)
+        self.assertNotIn('player', data)
+
+
+if __name__ == '__main__':
+    unittest.main()
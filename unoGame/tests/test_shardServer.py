@@ -0,0 +1,105 @@
+import select
+import socket
+import threading
+import unittest
+from unittest import mock
+
+from codec import encode_client_header, decode_login_response
+from framing import FramedSocket, frame_packet
+from protocal import PacketType
+import shardServer
+from shardServer import ShardRouter, ShardWorker, get_shard, MAX_LOGIN_SIZE
+
+
+class TestShardServer(unittest.TestCase):
+    def test_get_shard(self):
+        shards = [get_shard(f'room{i}', 4) for i in range(100)]
+        self.assertTrue(all(0 <= shard < 4 for shard in shards))
+        self.assertEqual(len(set(shards)), 4)
+        self.assertEqual(shards, [get_shard(f'room{i}', 4) for i in range(100)])
+
+    def test_handoff(self):
+        # The router has read the LOGIN packet from the client, and passes the connection and the packet to the worker
+        router_end, worker_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        worker = ShardWorker(worker_end)
+        threading.Thread(target=worker.start, daemon=True).start()
+        listener = socket.create_server(('127.0.0.1', 0))
+        client = FramedSocket(socket.create_connection(listener.getsockname()))
+        connection, _ = listener.accept()
+        client.send(encode_client_header(PacketType.LOGIN.value, 'a', 'room1'))
+        received = connection.recv(4096)
+        socket.send_fds(router_end, [b'L' + received], [connection.fileno()])
+        connection.close()
+        self.assertEqual(decode_login_response(client.recv_packet()), (PacketType.LOGIN_SUCCESS.value, True))
+        self.assertEqual(worker.rooms['room1'].players[0].name, 'a')
+        client.close()
+        router_end.close()
+        listener.close()
+
+
+class TestShardRouter(unittest.TestCase):
+    def setUp(self):
+        # A router with one shard whose channel ends here instead of in a worker process
+        self.router = ShardRouter('127.0.0.1', 0, 1)
+        self.router.server_socket.listen()
+        self.router.channels[0], self.worker_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.client = socket.create_connection(self.router.server_socket.getsockname())
+        self.router.accept()
+        self.connection = next(iter(self.router.pending))
+
+    def tearDown(self):
+        self.client.close()
+        self.worker_end.close()
+        self.router.channels[0].close()
+        self.router.server_socket.close()
+        for connection in list(self.router.pending):
+            self.router.drop(connection)
+
+    def send(self, data):
+        self.client.sendall(data)
+        select.select([self.connection], [], [], 5)
+        self.router.read_login(self.connection)
+
+    def test_login_split_over_several_reads(self):
+        packet = frame_packet(encode_client_header(PacketType.LOGIN.value, 'a', 'room1'))
+        for i in range(len(packet)):
+            self.assertIn(self.connection, self.router.pending)
+            self.send(packet[i:i + 1])
+        self.assertEqual(self.router.pending, {})
+        data, fds, _, _ = socket.recv_fds(self.worker_end, 4096, 1)
+        self.assertEqual(data, b'L' + packet)
+        self.assertEqual(len(fds), 1)
+        socket.socket(fileno=fds[0]).close()
+
+    def test_first_packet_must_be_login(self):
+        self.send(frame_packet(encode_client_header(PacketType.START_GAME.value, 'a', 'room1')))
+        self.assertEqual(self.router.pending, {})
+        self.assertEqual(self.client.recv(1), b'')  # Dropped, and nothing was handed over
+        self.worker_end.setblocking(False)
+        self.assertRaises(BlockingIOError, self.worker_end.recv, 1)
+
+    def test_oversized_first_packet_is_dropped(self):
+        self.send(frame_packet(b'x' * (MAX_LOGIN_SIZE + 1))[:16])
+        self.assertEqual(self.router.pending, {})
+        self.assertEqual(self.client.recv(1), b'')
+
+    def test_silent_connection_times_out(self):
+        self.router.close_idle_connections()
+        self.assertIn(self.connection, self.router.pending)
+        with mock.patch.object(shardServer, 'LOGIN_TIMEOUT', -1):
+            self.router.close_idle_connections()
+        self.assertEqual(self.router.pending, {})
+        self.assertEqual(self.client.recv(1), b'')
+
+    def test_dead_worker_does_not_stop_the_router(self):
+        self.worker_end.close()
+        with mock.patch.object(ShardRouter, 'start_worker') as start_worker:
+            self.router.workers[0] = mock.Mock(is_alive=lambda: False, exitcode=1)
+            self.send(frame_packet(encode_client_header(PacketType.LOGIN.value, 'a', 'room1')))
+        start_worker.assert_called_once_with(0)
+        self.assertEqual(self.router.pending, {})
+        self.assertEqual(self.client.recv(1), b'')
+
+
+if __name__ == '__main__':
+    unittest.main()
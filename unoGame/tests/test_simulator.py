@@ -0,0 +1,28 @@
+import random
+import unittest
+
+from policy import Policy, RandomPolicy
+from simulator import play_match, simulate
+
+
+class TestSimulator(unittest.TestCase):
+    def test_play_match(self):
+        rng = random.Random(3)
+        engine, moves = play_match([RandomPolicy(random.Random(seat)) for seat in range(4)], rng)
+        self.assertIsNotNone(engine.final_winner)
+        self.assertGreaterEqual(engine.final_winner.score, 500)
+        # Reshuffling the discard pile never creates or loses cards
+        self.assertEqual(len(engine.cards) + len(engine.discard_pile) + sum(len(p.cards_in_hand) for p in engine.players), 108)
+
+    def test_incomplete_policy_fails_when_built(self):
+        class NoMovePolicy(Policy):
+            pass
+
+        with self.assertRaises(TypeError):
+            NoMovePolicy()
+
+    def test_simulate_is_reproducible(self):
+        stats = simulate(5, processes=1, seed=7)
+        self.assertEqual(stats['matches'], 5)
+        self.assertEqual(sum(stats['wins']) + stats['unfinished'], 5)
+        self.assertEqual(stats['moves'], simulate(5, processes=1, seed=7)['moves'])